@@ -8,6 +8,20 @@
  *   Input (stdin):  "X Y\n" (e.g., "807440.44 100150.11\n")
  *   Output (stdout): "LON,LAT\n" (e.g., "5.99010000,44.05550000\n")
  *   Special: "EXIT\n" to quit
+ *
+ * Binary mode:
+ *   Sending "BINARY\n" switches stdin/stdout to binary frames. The helper
+ *   acknowledges with a single 0x01 byte. Each request is a little-endian
+ *   uint32 count N followed by N (X, Y) pairs of little-endian doubles; the
+ *   response is N (LON, LAT) pairs of little-endian doubles. Closing stdin
+ *   ends the process.
+ *
+ * Named pipe mode:
+ *   Sending "PIPE\n" makes the helper create a message-mode named pipe
+ *   \\.\pipe\navicon_<pid>, print its name on stdout and wait for one
+ *   client. Each request message is a binary-mode request (count + pairs)
+ *   and is answered with one response message (pairs). Closing the client
+ *   end ends the process.
  * 
  * Usage:
  *   Condor3XY2LatLon_persistent.exe <scenery_or_trn_path>
@@ -24,6 +38,12 @@
 #include <iomanip>
 #include <string>
 #include <sstream>
+#include <cstdio>
+#include <cstdint>
+#include <cstring>
+#include <vector>
+#include <io.h>
+#include <fcntl.h>
 #include <windows.h>
 #include <winreg.h>
 
@@ -94,6 +114,16 @@ int main(int argc, char **argv)
     std::cout << "READY" << std::endl;
     std::cout.flush();
 
+    // Convert n (X, Y) pairs in place to (LON, LAT)
+    auto convert_points = [&](double *pts, size_t n) {
+        for (size_t i = 0; i < 2 * n; i += 2) {
+            float x = (float)pts[i];
+            float y = (float)pts[i + 1];
+            pts[i] = f_xy2lon(x, y);
+            pts[i + 1] = f_xy2lat(x, y);
+        }
+    };
+
     // Main loop: read X Y from stdin, write LON,LAT to stdout
     std::string line;
     while (std::getline(std::cin, line)) {
@@ -109,6 +139,81 @@ int main(int argc, char **argv)
             break;
         }
 
+        if (line == "BINARY") {
+            _setmode(_fileno(stdin), _O_BINARY);
+            _setmode(_fileno(stdout), _O_BINARY);
+            std::fputc(0x01, stdout);
+            std::fflush(stdout);
+
+            uint32_t count;
+            std::vector<double> pts;
+            while (std::fread(&count, sizeof(count), 1, stdin) == 1) {
+                pts.resize(2 * (size_t)count);
+                if (std::fread(pts.data(), sizeof(double), pts.size(), stdin) != pts.size()) {
+                    break;
+                }
+                convert_points(pts.data(), count);
+                std::fwrite(pts.data(), sizeof(double), pts.size(), stdout);
+                std::fflush(stdout);
+            }
+            break;
+        }
+
+        if (line == "PIPE") {
+            char pipe_name[64];
+            std::snprintf(pipe_name, sizeof(pipe_name), "\\\\.\\pipe\\navicon_%lu", GetCurrentProcessId());
+            HANDLE pipe = CreateNamedPipeA(pipe_name, PIPE_ACCESS_DUPLEX,
+                                           PIPE_TYPE_MESSAGE | PIPE_READMODE_MESSAGE | PIPE_WAIT,
+                                           1, 65536, 65536, 0, NULL);
+            if (pipe == INVALID_HANDLE_VALUE) {
+                std::cout << "ERROR: Could not create named pipe" << std::endl;
+                std::cout.flush();
+                continue;
+            }
+            std::cout << pipe_name << std::endl;
+            std::cout.flush();
+            if (!ConnectNamedPipe(pipe, NULL) && GetLastError() != ERROR_PIPE_CONNECTED) {
+                CloseHandle(pipe);
+                return EXIT_FAILURE;
+            }
+
+            std::vector<char> msg(65536);
+            std::vector<double> pts;
+            for (;;) {
+                // Read one whole message, growing the buffer if it is larger
+                DWORD got = 0;
+                size_t total = 0;
+                BOOL ok;
+                for (;;) {
+                    ok = ReadFile(pipe, msg.data() + total, (DWORD)(msg.size() - total), &got, NULL);
+                    total += got;
+                    if (ok || GetLastError() != ERROR_MORE_DATA) {
+                        break;
+                    }
+                    msg.resize(msg.size() * 2);
+                }
+                if (!ok || total < sizeof(uint32_t)) {
+                    break;  // client closed the pipe
+                }
+
+                uint32_t count;
+                std::memcpy(&count, msg.data(), sizeof(count));
+                if (total != sizeof(count) + 2 * sizeof(double) * (size_t)count) {
+                    break;
+                }
+                pts.resize(2 * (size_t)count);
+                std::memcpy(pts.data(), msg.data() + sizeof(count), pts.size() * sizeof(double));
+                convert_points(pts.data(), count);
+
+                DWORD written;
+                if (!WriteFile(pipe, pts.data(), (DWORD)(pts.size() * sizeof(double)), &written, NULL)) {
+                    break;
+                }
+            }
+            CloseHandle(pipe);
+            break;
+        }
+
         // Parse "X Y"
         std::istringstream iss(line);
         float x, y;
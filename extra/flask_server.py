@@ -1,23 +1,119 @@
 from __future__ import annotations
 
 import os
+import gzip
 import time
+import heapq
 import math
-from typing import Dict, Any
-from flask import Flask, request, jsonify, Response, render_template_string
+import queue
+import threading
+from collections import deque
+from typing import Deque, Dict, Any, List, Tuple
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes jsonify() responses with orjson."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+# Compact, unsorted JSON output (orjson never indents or sorts; this covers
+# the stock provider)
+app.json.compact = True
+app.json.sort_keys = False
+
+# Gzip page and JSON responses for clients that accept it
+app.config["COMPRESS_MIMETYPES"] = ["application/json", "text/html", "text/css"]
+app.config["COMPRESS_MIN_SIZE"] = 512
+app.config["COMPRESS_ALGORITHM"] = "gzip"
+app.config["COMPRESS_LEVEL"] = 4
+# GET /api/positions gzips its own snapshot, so Compress's hook is installed
+# below with that endpoint left out
+app.config["COMPRESS_REGISTER"] = False
+_COMPRESS_EXEMPT = frozenset({"api_positions"})
+if Compress is not None:
+    _compress = Compress(app)
+
+    @app.after_request
+    def _compress_response(response: Response) -> Response:
+        if request.endpoint in _COMPRESS_EXEMPT:
+            return response
+        return _compress.after_request(response)
 
 # In-memory latest positions keyed by id (string)
-# Each value is a list of recent position dicts, newest last.
-# Each dict contains at least: id, lat, lon, updated_at (ISO), updated_ts (epoch seconds)
-POSITIONS: Dict[str, list[Dict[str, Any]]] = {}
+# Each value is a bounded deque of recent position dicts, newest last; the
+# oldest point is evicted automatically once TRAIL_MAX_POINTS is reached.
+# Each dict contains at least: id, lat, lon, updated_ts (epoch seconds),
+# plus "_json": the record's own serialized JSON, made once at ingest, and
+# "_seen": time.monotonic() at ingest, used for the TTL so clock jumps are harmless.
+# The ISO updated_at is only formatted when a record first reaches a GET
+# snapshot, and is cached in "_json_out" (see _snapshot_json).
+POSITIONS: Dict[str, Deque[Dict[str, Any]]] = {}
 TRAIL_MAX_POINTS = 50
 
+# Min-heap of (expiry on the time.monotonic() clock, id), exactly one entry per
+# id in POSITIONS, pushed when the id is first seen. A popped entry is checked
+# against the trail's newest point and requeued if the id was refreshed, so the
+# heap stays at one tuple per glider however fast updates arrive.
+_EXPIRY: List[Tuple[float, str]] = []
+
+# Optional numeric fields as (key, alternate key, normalizer); values are
+# rounded for storage and downstream responses
+_FLOAT_FIELDS = (
+    ("alt_m", "altitude_m", lambda v: round(v, 1)),
+    ("heading_deg", "heading", lambda v: int(round(v % 360.0))),
+    ("speed_mps", None, lambda v: round(v, 2)),
+    ("vario_mps", None, lambda v: round(v, 3)),
+)
+# Optional string fields, stored stripped when non-empty
+_STR_FIELDS = (
+    "identity", "aircraft",
+    "id_aircraft", "id_cn", "id_reg", "id_fname", "id_lname", "id_country",
+)
+
 # Prune entries older than this TTL (seconds)
 STALE_TTL_SEC = float(os.getenv("STALE_TTL_SEC", "30"))
+# Prune at most this often (seconds), however many clients are polling
+PRUNE_INTERVAL_SEC = 1.0
+_LAST_PRUNE = float("-inf")
+
+# Serialized GET /api/positions body, shared by all pollers. It is rebuilt
+# only after POSITIONS changes (_DATA_VERSION moves) and at most once per
+# SNAPSHOT_MAX_AGE_SEC. The ETag combines a per-process id with the version.
+# _SNAPSHOT_GZ is the same body gzipped alongside it (None below the
+# compression threshold).
+SNAPSHOT_MAX_AGE_SEC = 0.25
+_DATA_VERSION = 0
+_SNAPSHOT_VERSION = -1
+_SNAPSHOT_AT = float("-inf")
+_SNAPSHOT_BYTES = b"[]"
+_SNAPSHOT_GZ: bytes | None = None
+_BOOT_ID = format(time.time_ns(), "x")
 
 
 def _coerce_float(x):
@@ -30,27 +126,89 @@ def _coerce_float(x):
     return v
 
 
-def _now_iso_utc() -> str:
-    return datetime.now(timezone.utc).isoformat()
+def _iso_utc(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
 
 
-def _prune_stale() -> None:
-    """Remove entries older than STALE_TTL_SEC."""
-    if not POSITIONS:
-        return
-    now = time.time()
-    now = time.time()
-    stale_keys = []
-    for k, trail in POSITIONS.items():
-        if not trail: # handle empty trails
-            stale_keys.append(k)
-            continue
-        # Check the timestamp of the newest point in the trail
-        if (now - trail[-1].get("updated_ts", 0)) > STALE_TTL_SEC:
-            stale_keys.append(k)
+def _json_bytes(obj: Any) -> bytes:
+    """Serialize obj with the app's JSON settings, straight to bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return app.json.dumps(obj).encode("utf-8")
+
 
-    for k in stale_keys:
-        POSITIONS.pop(k, None)
+def _snapshot_json(record: Dict[str, Any]) -> bytes:
+    """Return the record's JSON with updated_at, formatting it on first use."""
+    out = record.get("_json_out")
+    if out is None:
+        # _json always ends with the closing brace of a non-empty object
+        stamp = _iso_utc(record["updated_ts"]).encode("ascii")
+        out = record["_json_out"] = record["_json"][:-1] + b',"updated_at":"' + stamp + b'"}'
+    return out
+
+
+def _prune_stale(now: float) -> None:
+    """Remove entries older than STALE_TTL_SEC."""
+    global _DATA_VERSION
+    while _EXPIRY and _EXPIRY[0][0] < now:
+        _, k = heapq.heappop(_EXPIRY)
+        expiry = POSITIONS[k][-1]["_seen"] + STALE_TTL_SEC
+        if expiry < now:
+            del POSITIONS[k]
+            _DATA_VERSION += 1
+        else:
+            # Refreshed since this entry was pushed; requeue at its new expiry
+            heapq.heappush(_EXPIRY, (expiry, k))
+
+
+def _new_record() -> Dict[str, Any]:
+    """Return an empty record dict, reusing one evicted from a trail if possible."""
+    try:
+        return _RECORD_POOL.pop()
+    except IndexError:
+        return {}
+
+
+def _apply_record(record: Dict[str, Any]) -> None:
+    """Append a parsed record to its glider's trail."""
+    glider_id = record["id"]
+    trail = POSITIONS.get(glider_id)
+    if trail is None:
+        trail = POSITIONS[glider_id] = deque(maxlen=TRAIL_MAX_POINTS)
+        heapq.heappush(_EXPIRY, (record["_seen"] + STALE_TTL_SEC, glider_id))
+    evicted = trail[0] if len(trail) == TRAIL_MAX_POINTS else None
+    trail.append(record)
+    if evicted is not None and len(_RECORD_POOL) < RECORD_POOL_MAX:
+        evicted.clear()
+        _RECORD_POOL.append(evicted)
+
+
+def _position_writer() -> None:
+    """Apply queued records to POSITIONS, draining the inbox in batches."""
+    global _DATA_VERSION
+    while True:
+        batch = [_INBOX.get()]
+        try:
+            while True:
+                batch.append(_INBOX.get_nowait())
+        except queue.Empty:
+            pass
+        with _POSITIONS_LOCK:
+            for record in batch:
+                _apply_record(record)
+            _DATA_VERSION += 1
+
+
+# POST handlers only parse and enqueue; a single writer thread applies the
+# records. Readers take _POSITIONS_LOCK to see a consistent POSITIONS.
+_INBOX: "queue.SimpleQueue[Dict[str, Any]]" = queue.SimpleQueue()
+_POSITIONS_LOCK = threading.Lock()
+# Records pushed out of full trails are cleared and reused for new POSTs.
+# A record is only recycled once TRAIL_MAX_POINTS newer fixes exist, and
+# responses are serialized under _POSITIONS_LOCK, so it is never in use.
+RECORD_POOL_MAX = 4096
+_RECORD_POOL: list[Dict[str, Any]] = []
+threading.Thread(target=_position_writer, name="position-writer", daemon=True).start()
 
 
 @app.route("/api/positions", methods=["POST"])
@@ -75,142 +233,70 @@ def api_positions_post() -> Response:
             continue
         glider_id = str(cookie)
 
-        raw_lat = pos_data.get("lat")
-        raw_lon = pos_data.get("lon")
-        lat_f = _coerce_float(raw_lat)
-        lon_f = _coerce_float(raw_lon)
-
+        lat_f = _coerce_float(pos_data.get("lat"))
+        lon_f = _coerce_float(pos_data.get("lon"))
         if lat_f is None or lon_f is None:
             continue
 
-        # Clamp to reasonable ranges
-        lat_f = max(-90.0, min(90.0, lat_f))
-        # Normalize lon into [-180, 180]
-        lon_f = ((lon_f + 180.0) % 360.0) - 180.0
-
-        # Store as floats to preserve numeric precision and consistency
-        lat = lat_f
-        lon = lon_f
-
-        alt_m = _coerce_float(pos_data.get("alt_m"))
-        if alt_m is None:
-            # accept alternate field name for convenience
-            alt_m = _coerce_float(pos_data.get("altitude_m"))
-
-        heading_deg = _coerce_float(pos_data.get("heading_deg"))
-        if heading_deg is None:
-            heading_deg = _coerce_float(pos_data.get("heading"))
-        if heading_deg is not None:
-            heading_deg = (heading_deg % 360.0 + 360.0) % 360.0
-
-        speed_mps = _coerce_float(pos_data.get("speed_mps"))
-        vario_mps = _coerce_float(pos_data.get("vario_mps"))
-
-        # Round for storage and downstream responses
-        if alt_m is not None:
-            alt_m = round(alt_m, 1)
-        if heading_deg is not None:
-            heading_deg = int(round(heading_deg))
-        if speed_mps is not None:
-            speed_mps = round(speed_mps, 2)
-        if vario_mps is not None:
-            vario_mps = round(vario_mps, 3)
-
-        identity = (pos_data.get("identity") or "").strip()
-        aircraft = (pos_data.get("aircraft") or "").strip()
-        timestamp_client = (pos_data.get("timestamp") or "").strip()
-        
-        # Extract individual identity fields
-        id_aircraft = (pos_data.get("id_aircraft") or "").strip()
-        id_cn = (pos_data.get("id_cn") or "").strip()
-        id_reg = (pos_data.get("id_reg") or "").strip()
-        id_fname = (pos_data.get("id_fname") or "").strip()
-        id_lname = (pos_data.get("id_lname") or "").strip()
-        id_country = (pos_data.get("id_country") or "").strip()
-
-        now_iso = _now_iso_utc()
-        now_ts = time.time()
-
-        record = {
-            "id": glider_id,  # This is now the cookie
-            "cookie": cookie,
-            "entity_id": pos_data.get("id"),  # Store the original id as entity_id
-            "lat": lat,
-            "lon": lon,
-            "updated_at": now_iso,
-            "updated_ts": now_ts,
-        }
-        if timestamp_client:
+        record = _new_record()
+        record["id"] = glider_id  # This is now the cookie
+        record["cookie"] = cookie
+        record["entity_id"] = pos_data.get("id")  # Store the original id as entity_id
+        # Clamp lat to reasonable ranges and normalize lon into [-180, 180]
+        record["lat"] = max(-90.0, min(90.0, lat_f))
+        record["lon"] = ((lon_f + 180.0) % 360.0) - 180.0
+        record["updated_ts"] = time.time()
+        if timestamp_client := (pos_data.get("timestamp") or "").strip():
             record["timestamp"] = timestamp_client
-        if alt_m is not None:
-            record["alt_m"] = alt_m
-        if heading_deg is not None:
-            record["heading_deg"] = heading_deg
-        if speed_mps is not None:
-            record["speed_mps"] = speed_mps
-        if vario_mps is not None:
-            record["vario_mps"] = vario_mps
-        if identity:
-            record["identity"] = identity
-        if aircraft:
-            record["aircraft"] = aircraft
-        if id_aircraft:
-            record["id_aircraft"] = id_aircraft
-        if id_cn:
-            record["id_cn"] = id_cn
-        if id_reg:
-            record["id_reg"] = id_reg
-        if id_fname:
-            record["id_fname"] = id_fname
-        if id_lname:
-            record["id_lname"] = id_lname
-        if id_country:
-            record["id_country"] = id_country
-
-        if glider_id not in POSITIONS:
-            POSITIONS[glider_id] = []
-        
-        trail = POSITIONS[glider_id]
-        trail.append(record)
-
-        # Keep trail length at max TRAIL_MAX_POINTS
-        if len(trail) > TRAIL_MAX_POINTS:
-            POSITIONS[glider_id] = trail[-TRAIL_MAX_POINTS:]
+        for key, alt_key, normalize in _FLOAT_FIELDS:
+            v = _coerce_float(pos_data.get(key))
+            if v is None and alt_key is not None:
+                v = _coerce_float(pos_data.get(alt_key))
+            if v is not None:
+                record[key] = normalize(v)
+        for key in _STR_FIELDS:
+            if (v := pos_data.get(key)) and (v := v.strip()):
+                record[key] = v
+        # Serialize once here; every GET snapshot reuses this fragment
+        record["_json"] = _json_bytes(record)
+        record["_seen"] = time.monotonic()
+
+        _INBOX.put(record)
 
     return ("", 204)
 
 
 @app.route("/api/positions", methods=["GET"])
 def api_positions() -> Response:
-    _prune_stale()
-    # Return as a list of the LATEST positions for simpler client handling
-    out = []
-    for trail in POSITIONS.values():
-        if not trail: continue
-        rec = trail[-1] # Get the latest position
-        d = dict(rec)
-        # Ensure lat/lon are numeric in the response (back-compat if older records stored strings)
-        if "lat" in d:
-            try:
-                d["lat"] = float(d["lat"])
-            except (TypeError, ValueError):
-                pass
-        if "lon" in d:
-            try:
-                d["lon"] = float(d["lon"])
-            except (TypeError, ValueError):
-                pass
-        # Round numeric fields to reduce payload size
-        if (v := d.get("alt_m")) is not None and isinstance(v, (int, float)):
-            d["alt_m"] = round(float(v), 1)
-        if (v := d.get("heading_deg")) is not None and isinstance(v, (int, float)):
-            d["heading_deg"] = int(round(float(v)))
-        if (v := d.get("speed_mps")) is not None and isinstance(v, (int, float)):
-            d["speed_mps"] = round(float(v), 2)
-        if (v := d.get("vario_mps")) is not None and isinstance(v, (int, float)):
-            d["vario_mps"] = round(float(v), 3)
-        out.append(d)
-    return jsonify(out)
+    # Return as a list of the LATEST positions for simpler client handling.
+    # Records are normalized and rounded at ingest, so they are serialized as
+    # stored; only the cached "_json_out" is added, under _POSITIONS_LOCK.
+    global _LAST_PRUNE, _SNAPSHOT_VERSION, _SNAPSHOT_AT, _SNAPSHOT_BYTES, _SNAPSHOT_GZ
+    with _POSITIONS_LOCK:
+        now = time.monotonic()
+        if now - _LAST_PRUNE > PRUNE_INTERVAL_SEC:
+            _prune_stale(now)
+            _LAST_PRUNE = now
+        if _SNAPSHOT_VERSION != _DATA_VERSION and now - _SNAPSHOT_AT >= SNAPSHOT_MAX_AGE_SEC:
+            # Trails are created with their first record, so none is empty
+            _SNAPSHOT_BYTES = b"[" + b",".join(_snapshot_json(trail[-1]) for trail in POSITIONS.values()) + b"]"
+            _SNAPSHOT_GZ = (gzip.compress(_SNAPSHOT_BYTES, app.config["COMPRESS_LEVEL"])
+                            if len(_SNAPSHOT_BYTES) >= app.config["COMPRESS_MIN_SIZE"] else None)
+            _SNAPSHOT_VERSION = _DATA_VERSION
+            _SNAPSHOT_AT = now
+        body, body_gz, version = _SNAPSHOT_BYTES, _SNAPSHOT_GZ, _SNAPSHOT_VERSION
+
+    # no-cache makes browsers revalidate every poll; unchanged data is a 304.
+    # Each encoding gets its own ETag so a 304 always matches what the client holds.
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    etag = f"{_BOOT_ID}-{version}"
+    if body_gz is not None and "gzip" in request.headers.get("Accept-Encoding", ""):
+        body = body_gz
+        headers["Content-Encoding"] = "gzip"
+        etag += "-gz"
+    resp = Response(body, mimetype="application/json", headers=headers)
+    resp.set_etag(etag, weak=True)
+    return resp.make_conditional(request)
 
 
 INDEX_HTML = """
@@ -389,9 +475,18 @@ INDEX_HTML = """
 """
 
 
+# INDEX_HTML has no template variables, so encode (and gzip) it once at import
+_INDEX_BYTES = INDEX_HTML.encode("utf-8")
+_INDEX_GZ = gzip.compress(_INDEX_BYTES, 6)
+_INDEX_HEADERS = {"Cache-Control": "public, max-age=300", "Vary": "Accept-Encoding"}
+
+
 @app.route("/")
 def index() -> Response:
-    return render_template_string(INDEX_HTML)
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        return Response(_INDEX_GZ, mimetype="text/html",
+                        headers={**_INDEX_HEADERS, "Content-Encoding": "gzip"})
+    return Response(_INDEX_BYTES, mimetype="text/html", headers=_INDEX_HEADERS)
 
 
 def main():
@@ -400,7 +495,14 @@ def main():
         port = int(os.getenv("FLASK_PORT", "5000"))
     except ValueError:
         port = 5000
-    app.run(host=host, port=port, debug=False, threaded=True)
+    # FLASK_SERVER=waitress|werkzeug; waitress (keep-alive, thread pool) is
+    # used when installed unless the Werkzeug dev server is requested
+    server = os.getenv("FLASK_SERVER", "waitress").lower()
+    if server == "waitress" and waitress is not None:
+        waitress.serve(app, host=host, port=port, threads=16,
+                       connection_limit=1000, channel_timeout=30)
+    else:
+        app.run(host=host, port=port, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
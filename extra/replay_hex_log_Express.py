@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 import argparse
-import datetime
+import itertools
+import mmap
+import multiprocessing
 import os
 import sys
 import time
+from collections import deque
 
 # Reuse the parsing logic from sniffAndDecodeUDP_toExpress.py
 try:
@@ -16,39 +19,150 @@ try:
         parse_settings_packet,
         flush_position_batch,
     )
+    import sniffAndDecodeUDP_toExpress as decoder
 except Exception as e:
     print(f"[!] Failed to import parsers from sniffAndDecodeUDP_toExpress.py: {e}")
     print(f"[!] Make sure sniffAndDecodeUDP_toExpress.py is in the same directory")
     sys.exit(1)
 
 
-def parse_line(hex_data: str) -> str:
-    """Dispatch to appropriate parser based on packet type, mirroring packet_handler()."""
-    hex_data = hex_data.strip().lower()
+# Packet type (first two bytes as lowercase hex) -> parser, mirroring packet_handler().
+# Only lowercase keys: the parsers compare message types in lowercase themselves, so
+# lines must be lowercased anyway (iter_hex_lines does it per chunk), and uppercase
+# aliases here would just route uppercase lines into parsers that reject them.
+PARSERS = {
+    "3d00": parse_telemetry_packet,
+    "3900": parse_telemetry_packet,
+    "3100": parse_telemetry_packet,
+    "1f00": parse_fpl_task_packet,
+    "0700": parse_disabled_list_packet,
+    "0f00": parse_disabled_list_packet,
+    "2f00": parse_settings_packet,
+    "3f00": parse_identity_packet,
+    "3f01": parse_identity_packet,
+    "8006": parse_ack_packet,
+}
+
+
+def parse_line(hex_data: str, normalized: bool = False, _get_parser=PARSERS.get) -> str:
+    """Dispatch to appropriate parser based on packet type, mirroring packet_handler().
+
+    Lines from iter_hex_lines() are already stripped and lowercase; pass
+    normalized=True to skip doing that again. _get_parser binds the dispatch
+    lookup as a local; callers should not pass it.
+    """
+    if not normalized:
+        hex_data = hex_data.strip().lower()
     if not hex_data:
         return ""
 
+    parser = _get_parser(hex_data[:4])
+    if parser is None:
+        return f"[?] UNKNOWN PACKET TYPE\n    - Full HEX: {hex_data}"
     try:
-        if hex_data.startswith(("3d00", "3900", "3100")):
-            return parse_telemetry_packet(hex_data)
-        elif hex_data.startswith("1f00"):
-            return parse_fpl_task_packet(hex_data)
-        elif hex_data.startswith(("0700", "0f00")):
-            return parse_disabled_list_packet(hex_data)
-        elif hex_data.startswith("2f00"):
-            return parse_settings_packet(hex_data)
-        elif hex_data.startswith(("3f00", "3f01")):
-            return parse_identity_packet(hex_data)
-        elif hex_data.startswith("8006"):
-            return parse_ack_packet(hex_data)
-        else:
-            return f"[?] UNKNOWN PACKET TYPE\n    - Full HEX: {hex_data}"
+        return parser(hex_data)
     except Exception as e:
         return f"[!] Error parsing line: {e}\n    HEX: {hex_data}"
 
 
-def replay_file(path: str, delay_ms: int = 0, max_lines: int | None = None, direction: str = "IN", send_to_express: bool = False):
-    """Read hex lines from file and parse each as if streaming in."""
+SEPARATOR = "-" * 60 + "\n"
+# Decoded output is written in chunks of this many packets (or bytes)
+WRITE_BATCH_LINES = 256
+WRITE_BATCH_BYTES = 65536
+# Hex logs are plain ASCII; they are memory-mapped and split in windows of at least this size
+READ_CHUNK_BYTES = 1 << 20
+
+
+def iter_hex_lines(path: str):
+    """Yield the non-empty lines of an ASCII hex log as stripped, lowercase str."""
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            while pos < size:
+                # Extend each window to the next newline so no line is cut in two
+                end = mm.find(b"\n", pos + READ_CHUNK_BYTES) + 1 or size
+                # Lowercase a whole window at once rather than each line in parse_line()
+                for raw in mm[pos:end].lower().split(b"\n"):
+                    line = raw.strip()
+                    if line:
+                        yield line.decode("ascii", "ignore")
+                pos = end
+
+
+# Packet types whose parsers keep replay state (identity map, FPL reassembly) or write
+# files. In bulk mode the main process parses these itself, in log order.
+IDENTITY_TYPES = frozenset(("3f00", "3f01"))
+STATEFUL_TYPES = IDENTITY_TYPES | {"1f00", "0700", "0f00", "2f00"}
+BULK_BATCH_LINES = 1024
+
+
+def _init_bulk_worker():
+    """Bulk worker setup: never POST positions or rewrite identity_map.json."""
+    decoder.EXPRESS_ENDPOINT = ""
+    decoder.persist_identity_map = lambda: None
+
+
+def _parse_batch(lines: list, cookie_map: dict) -> list:
+    """
+    Parse a batch of hex lines in a bulk worker.
+
+    Args:
+        lines: Normalized hex lines (see iter_hex_lines) in log order
+        cookie_map: The main process's COOKIE_MAP as of the start of the batch
+
+    Returns:
+        parse_line() output per line, or None for stateful packet types
+    """
+    decoder.COOKIE_MAP.clear()
+    decoder.COOKIE_MAP.update(cookie_map)
+    out = []
+    for line in lines:
+        packet_type = line[:4]
+        if packet_type in STATEFUL_TYPES:
+            if packet_type in IDENTITY_TYPES:
+                # Keeps identities current for telemetry later in this batch
+                parse_line(line, True)
+            out.append(None)
+        else:
+            out.append(parse_line(line, True))
+    return out
+
+
+def bulk_parse(path: str, jobs: int):
+    """
+    Yield parse_line() output for every line of a hex log, in order, using worker processes.
+
+    Args:
+        path: Hex log file
+        jobs: Number of worker processes
+    """
+    lines = iter_hex_lines(path)
+    pending = deque()
+    with multiprocessing.Pool(jobs, initializer=_init_bulk_worker) as pool:
+        while True:
+            batch = list(itertools.islice(lines, BULK_BATCH_LINES))
+            if batch:
+                cookie_map = dict(decoder.COOKIE_MAP)
+                local = [parse_line(line, True) if line[:4] in STATEFUL_TYPES else None for line in batch]
+                pending.append((pool.apply_async(_parse_batch, (batch, cookie_map)), local))
+                if len(pending) < 4 * jobs:
+                    continue
+            if not pending:
+                break
+            result, local = pending.popleft()
+            for mine, theirs in zip(local, result.get()):
+                yield mine if theirs is None else theirs
+
+
+def replay_file(path: str, delay_ms: int = 0, max_lines: int | None = None, direction: str = "IN", send_to_express: bool = False, jobs: int = 1):
+    """Read hex lines from file and parse each as if streaming in.
+
+    With jobs > 1, no delay and no Express forwarding, lines are parsed in batches
+    on a pool of worker processes and printed in their original order.
+    """
     if not os.path.exists(path):
         print(f"[!] File not found: {path}")
         sys.exit(2)
@@ -58,29 +172,58 @@ def replay_file(path: str, delay_ms: int = 0, max_lines: int | None = None, dire
         print(f"[*] Sending positions to Express.js (batched every 1.0s at 1Hz)")
     else:
         print(f"[*] Dry-run mode (not sending to Express.js)")
+    bulk = jobs > 1 and delay_ms == 0 and not send_to_express
+    if bulk:
+        print(f"[*] Bulk mode: parsing on {jobs} processes")
     print("-" * 60)
 
     count = 0
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line:
-                continue
-            parsed_output = parse_line(line)
+    out = []
+    out_size = 0
+    # Per-line calls bound to locals
+    append = out.append
+    now_ns = time.time_ns
+    # Timestamp text up to whole seconds, rebuilt only when the second changes
+    last_sec = -1
+    date_prefix = ""
+    if bulk:
+        outputs = bulk_parse(path, jobs)
+    else:
+        outputs = (parse_line(line, True) for line in iter_hex_lines(path))
+    try:
+        for parsed_output in outputs:
             if not parsed_output:
                 continue
 
-            # Match timestamp format used in packet_handler()
-            ts = datetime.datetime.now().strftime("%Y-m-d %H:%M:%S.%f")[:-3]
-            final_output = f"[{ts}] [{direction}] {parsed_output}"
-            print(final_output)
-            print("-" * 60)
+            # Local time with milliseconds, as in packet_handler()
+            sec, ns = divmod(now_ns(), 1_000_000_000)
+            if sec != last_sec:
+                date_prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+                last_sec = sec
+            ts = f"{date_prefix}.{ns // 1_000_000:03d}"
+            final_output = f"[{ts}] [{direction}] {parsed_output}\n"
+            append(final_output)
+            append(SEPARATOR)
+            out_size += len(final_output)
 
             count += 1
             if max_lines is not None and count >= max_lines:
                 break
             if delay_ms > 0:
+                # Simulated streaming: show each packet as it arrives
+                sys.stdout.write("".join(out))
+                sys.stdout.flush()
+                out.clear()
+                out_size = 0
                 time.sleep(delay_ms / 1000.0)
+            elif len(out) >= 2 * WRITE_BATCH_LINES or out_size >= WRITE_BATCH_BYTES:
+                sys.stdout.write("".join(out))
+                out.clear()
+                out_size = 0
+    finally:
+        outputs.close()
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
     
     # Flush any remaining batched positions to Express.js
     if send_to_express:
@@ -96,9 +239,10 @@ def main():
     ap.add_argument("--max-lines", type=int, default=None, help="Stop after N lines (for quick tests)")
     ap.add_argument("--direction", choices=["IN", "OUT", "REPLAY"], default="REPLAY", help="Direction label to display")
     ap.add_argument("--send-to-express", action="store_true", help="Send positions to Express.js server (batched at 1Hz)")
+    ap.add_argument("--jobs", type=int, default=1, help="Parse on N processes (only with --delay-ms 0 and without --send-to-express)")
     args = ap.parse_args()
 
-    replay_file(args.logfile, delay_ms=args.delay_ms, max_lines=args.max_lines, direction=args.direction, send_to_express=args.send_to_express)
+    replay_file(args.logfile, delay_ms=args.delay_ms, max_lines=args.max_lines, direction=args.direction, send_to_express=args.send_to_express, jobs=args.jobs)
 
 
 if __name__ == "__main__":
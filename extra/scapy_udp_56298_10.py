@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import atexit
 import datetime
 import math
 import struct
@@ -6,6 +7,11 @@ from scapy.all import sniff, UDP
 from aa3_converter import convert_xy_to_lat_lon
 import os
 import json
+import queue
+import re
+import sys
+import threading
+import time
 try:
     import navicon_bridge  # Out-of-process 32-bit DLL bridge
 except Exception:
@@ -17,37 +23,54 @@ SNIFF_PORT = 56298
 # Standard gravity for G-force calculation
 GRAVITY_MS2 = 9.80665
 
+# Speed conversion
+MPS_TO_KNOTS = 1.9438445
+
 # Global file handlers for logging
 LOG_FILE = None
 HEX_LOG_FILE = None
 
+# Packets are decoded, printed and logged by a writer thread, keeping the sniffer callback short
+LOG_QUEUE = queue.SimpleQueue()  # (timestamp, payload) tuples; None stops the writer
+LOG_FLUSH_INTERVAL_S = 0.1  # Flush console and log files at most this often
+LOG_WRITER_THREAD = None
+
 # Identity mapping persistence
 IDENTITY_JSON_FILE = "identity_map.json"
 COOKIE_MAP = {}          # cookie (int) -> identity dict
 ENTITY_TO_COOKIE = {}    # entity_id (int) -> cookie (int)
+IDENTITY_LINE_CACHE = {} # cookie (int) -> formatted identity line, dropped when COOKIE_MAP[cookie] changes
+IDENTITY_PERSIST_INTERVAL_S = 2.0  # Rewrite identity_map.json at most this often
+_identity_dirty = False  # COOKIE_MAP changed since the last write
+_last_identity_persist = 0.0
 
+# A plausible length byte (2-32) followed by at least two printable ASCII bytes;
+# group 1 is the whole printable run, checked against the length by the caller
+LENGTH_PREFIXED_STRING = re.compile(rb"[\x02-\x20](?=([\x20-\x7e]{2,}))")
+
+# 0x3d00 payload words used below: u32[0] cookie, f32[2..10] position/velocity/accel
+TELEMETRY_FIELDS = struct.Struct("<I4x9f")
+TELEMETRY_TAIL = struct.Struct("<6I")  # last six u32 words
+
+# Packet headers after the 2-byte message type
+TELEMETRY_HEADER = struct.Struct("<2xHI")  # counter (CN), identifier (ID)
+ACK_HEADER = struct.Struct("<4xH")  # acknowledged CN
+IDENTITY_HEADER = struct.Struct("<2xHII")  # seq, entity_id, cookie
 
-def decode_3d00_payload(payload_hex: str) -> dict:
-    """Decode a 0x3d00 telemetry payload into useful fields."""
-    b = bytes.fromhex(payload_hex)
-    words = [b[i:i+4] for i in range(0, len(b), 4) if len(b[i:i+4]) == 4]
-    floats = [struct.unpack("<f", w)[0] for w in words]
-    u32s = [int.from_bytes(w, "little") for w in words]
 
+def decode_3d00_payload(payload: bytes) -> dict:
+    """Decode a 0x3d00 telemetry payload into useful fields."""
     # Field mapping based on analysis
     # First u32 is the cookie/session identifier
-    cookie = u32s[0] if u32s else 0
-    pos_x = floats[2]
-    pos_y = floats[3]
-    altitude_m = floats[4]
+    (cookie, pos_x, pos_y, altitude_m,
+     vx, vy, vz, ax, ay, az) = TELEMETRY_FIELDS.unpack_from(payload)
     altitude_ft = altitude_m * 3.28084 # Conversion to feet
 
     # Corrected velocity vectors are at floats[5], [6], [7]
-    vx, vy, vz = floats[5], floats[6], floats[7]
-    speed_mps = math.sqrt(vx * vx + vy * vy + vz * vz)
-    speed_kt = speed_mps * 1.9438445
+    speed_mps = math.hypot(vx, vy, vz)
+    speed_kt = speed_mps * MPS_TO_KNOTS
     vario_mps = vz
-    vario_kt = vario_mps * 1.9438445 # Vario in knots
+    vario_kt = vario_mps * MPS_TO_KNOTS # Vario in knots
 
     # --- Corrected Heading Calculation ---
     # Calculate heading from vx and vy, negating vx to fix inverted axis
@@ -56,11 +79,10 @@ def decode_3d00_payload(payload_hex: str) -> dict:
     heading = (heading_deg + 360) % 360  # Convert to 0-360 degrees
 
     # Corrected acceleration vectors are at floats[8], [9], [10]
-    ax, ay, az = floats[8], floats[9], floats[10]
-    a_mag = math.sqrt(ax * ax + ay * ay + az * az)
+    a_mag = math.hypot(ax, ay, az)
     g_force = a_mag / GRAVITY_MS2 # Calculate G-Force
 
-    tail = u32s[-6:]
+    tail = list(TELEMETRY_TAIL.unpack_from(payload, len(payload) // 4 * 4 - TELEMETRY_TAIL.size))
 
     return {
         "cookie": cookie,
@@ -82,18 +104,43 @@ def decode_3d00_payload(payload_hex: str) -> dict:
     }
 
 
-def parse_telemetry_packet(hex_data: str) -> str:
+def _clean(s: str) -> str:
+    return s.replace("\r", " ").replace("\n", " ").strip() if s else ""
+
+
+def build_identity_line(cookie: int) -> str:
+    """Format the identity shown with telemetry for a cookie, and cache it."""
+    cookie_hex = f"{cookie:08x}"
+    ident = COOKIE_MAP.get(cookie)
+    if ident:
+        cn = _clean(ident.get("cn", ""))
+        first = _clean(ident.get("first_name", ""))
+        last = _clean(ident.get("last_name", ""))
+        aircraft = _clean(ident.get("aircraft", ""))
+        parts = [p for p in (cn, first, last) if p]
+        extra = f" | Aircraft: {aircraft}" if aircraft else ""
+        identity_line = (" ".join(parts) + extra + f" [cookie {cookie_hex}]").strip()
+        if not parts:
+            identity_line = f"unknown [cookie {cookie_hex}]"
+    else:
+        identity_line = f"unknown [cookie {cookie_hex}]"
+    IDENTITY_LINE_CACHE[cookie] = identity_line
+    return identity_line
+
+
+def parse_telemetry_packet(payload: bytes) -> str:
     """Decodes telemetry packets (0x3d00 and friends)."""
+    hex_data = payload.hex()
     try:
         msg_type = hex_data[0:4]
-        cn_bytes = bytes.fromhex(hex_data[4:8])
-        cn_decimal = int.from_bytes(cn_bytes, "little")
-        id_bytes = bytes.fromhex(hex_data[8:16])
-        id_decimal = int.from_bytes(id_bytes, "little")
-        payload_hex = hex_data[16:]
+        if len(payload) >= TELEMETRY_HEADER.size:
+            cn_decimal, id_decimal = TELEMETRY_HEADER.unpack_from(payload)
+        else:  # Truncated header: decode whatever is there
+            cn_decimal = int.from_bytes(payload[2:4], "little")
+            id_decimal = int.from_bytes(payload[4:8], "little")
 
         if msg_type == "3d00":
-            decoded = decode_3d00_payload(payload_hex)
+            decoded = decode_3d00_payload(payload[8:])
             # Prefer conversion via NaviCon.dll bridge (AA3.trn in project root), fallback to calibrated model
             lat = lon = float('nan')
             try:
@@ -105,24 +152,9 @@ def parse_telemetry_packet(hex_data: str) -> str:
                 # Fallback to parametric converter
                 lat, lon = convert_xy_to_lat_lon(decoded["pos_x"], decoded["pos_y"])
 
-            # Identity lookup by cookie
+            # Identity lookup by cookie (formatted once per identity update)
             cookie = decoded.get("cookie", 0)
-            cookie_hex = f"{cookie:08x}"
-            ident = COOKIE_MAP.get(cookie)
-            if ident:
-                def _clean(s: str) -> str:
-                    return s.replace("\r", " ").replace("\n", " ").strip() if s else ""
-                cn = _clean(ident.get("cn", ""))
-                first = _clean(ident.get("first_name", ""))
-                last = _clean(ident.get("last_name", ""))
-                aircraft = _clean(ident.get("aircraft", ""))
-                parts = [p for p in (cn, first, last) if p]
-                extra = f" | Aircraft: {aircraft}" if aircraft else ""
-                identity_line = (" ".join(parts) + extra + f" [cookie {cookie_hex}]").strip()
-                if not parts:
-                    identity_line = f"unknown [cookie {cookie_hex}]"
-            else:
-                identity_line = f"unknown [cookie {cookie_hex}]"
+            identity_line = IDENTITY_LINE_CACHE.get(cookie) or build_identity_line(cookie)
 
             output = (
                 f"[+] TELEMETRY PACKET DETECTED\n"
@@ -155,12 +187,15 @@ def parse_telemetry_packet(hex_data: str) -> str:
         return f"[!] Error parsing Telemetry packet: {e}\n    HEX: {hex_data}"
 
 
-def parse_ack_packet(hex_data: str) -> str:
+def parse_ack_packet(payload: bytes) -> str:
     """Decodes the short acknowledgement packets."""
+    hex_data = payload.hex()
     try:
         msg_type = hex_data[0:8]
-        ack_cn_bytes = bytes.fromhex(hex_data[8:12])
-        ack_cn_decimal = int.from_bytes(ack_cn_bytes, "little")
+        if len(payload) >= ACK_HEADER.size:
+            ack_cn_decimal, = ACK_HEADER.unpack_from(payload)
+        else:  # Truncated header: decode whatever is there
+            ack_cn_decimal = int.from_bytes(payload[4:6], "little")
         payload_hex = hex_data[12:]
 
         output = (
@@ -195,10 +230,24 @@ def persist_identity_map():
         # Keep runtime resilient; don't crash on IO issues
         pass
 
-def parse_identity_packet(hex_data: str) -> str:
+
+def persist_identity_map_debounced(force: bool = False):
+    """Persist the identity map if it changed, at most once per IDENTITY_PERSIST_INTERVAL_S."""
+    global _identity_dirty, _last_identity_persist
+    if not _identity_dirty:
+        return
+    now = time.monotonic()
+    if force or now - _last_identity_persist >= IDENTITY_PERSIST_INTERVAL_S:
+        _identity_dirty = False
+        _last_identity_persist = now
+        persist_identity_map()
+
+def parse_identity_packet(payload: bytes) -> str:
     """Decode 0x3f00/3f01 identity/config packet and update mappings."""
+    global _identity_dirty
+    hex_data = payload.hex()
     try:
-        b = bytes.fromhex(hex_data)
+        b = payload
         if len(b) < 20:
             return f"[!] Identity packet too short (len={len(b)})\n    HEX: {hex_data}"
         
@@ -206,9 +255,7 @@ def parse_identity_packet(hex_data: str) -> str:
         if msg_type not in ("3f00", "3f01"):
             return f"[!] Not an identity packet (type=0x{msg_type})\n    HEX: {hex_data}"
 
-        seq = int.from_bytes(b[2:4], "little")
-        entity_id = int.from_bytes(b[4:8], "little")
-        cookie = int.from_bytes(b[8:12], "little")
+        seq, entity_id, cookie = IDENTITY_HEADER.unpack_from(b)
 
         # --- New Parsing Logic ---
         
@@ -219,21 +266,18 @@ def parse_identity_packet(hex_data: str) -> str:
         
         def find_next_string(start_offset):
             """Scans for the next length-prefixed ASCII string."""
-            i = start_offset
-            while i < len(b):
+            search = LENGTH_PREFIXED_STRING.search
+            m = search(b, start_offset)
+            while m:
+                i = m.start()
                 length = b[i]
-                # Plausible length for a name/field? (e.g., 2-32 chars)
-                if 2 <= length <= 32 and (i + 1 + length) <= len(b):
-                    val_bytes = b[i+1 : i+1+length]
-                    try:
-                        # Check if all bytes are printable ASCII
-                        if all(32 <= c < 127 for c in val_bytes):
-                            val = val_bytes.decode('ascii').strip()
-                            # Return the found string and the offset AFTER this field
-                            return val, i + 1 + length
-                    except UnicodeDecodeError:
-                        pass # Not a valid string, continue scanning
-                i += 1
+                printable = m.group(1)
+                # All `length` bytes after the length byte must be printable ASCII
+                if len(printable) >= length:
+                    val = printable[:length].decode('ascii').strip()
+                    # Return the found string and the offset AFTER this field
+                    return val, i + 1 + length
+                m = search(b, i + 1)
             return "", len(b) # Not found
 
         # Find fields in their expected order
@@ -266,7 +310,10 @@ def parse_identity_packet(hex_data: str) -> str:
             "seen_at": datetime.datetime.now().isoformat(),
         }
         ENTITY_TO_COOKIE[entity_id] = cookie
-        persist_identity_map()
+        IDENTITY_LINE_CACHE.pop(cookie, None)
+        # Join bursts bring many identity packets at once; write the file once per interval
+        _identity_dirty = True
+        persist_identity_map_debounced()
 
         return (
             f"[+] IDENTITY PACKET DETECTED\n"
@@ -284,38 +331,117 @@ def parse_identity_packet(hex_data: str) -> str:
     except Exception as e:
         return f"[!] Error parsing identity packet: {e}\n    HEX: {hex_data}"
 
-def packet_handler(packet):
-    """Main handler function for processing each captured packet."""
-    if UDP not in packet or packet[UDP].dport != SNIFF_PORT:
-        return
+# First two payload bytes (message type) -> parser taking the raw payload
+PACKET_PARSERS = {
+    b"\x3d\x00": parse_telemetry_packet,
+    b"\x39\x00": parse_telemetry_packet,
+    b"\x31\x00": parse_telemetry_packet,
+    b"\x3f\x00": parse_identity_packet,
+    b"\x3f\x01": parse_identity_packet,
+    b"\x80\x06": parse_ack_packet,
+}
+
+
+_timestamp_second = None  # Whole second that _timestamp_prefix was formatted for
+_timestamp_prefix = ""
+
+
+def format_timestamp() -> str:
+    """Current local time as "YYYY-MM-DD HH:MM:SS.mmm", running strftime once per second."""
+    global _timestamp_second, _timestamp_prefix
+    now = time.time()
+    second = int(now)
+    if second != _timestamp_second:
+        _timestamp_second = second
+        _timestamp_prefix = time.strftime("%Y-%m-%d %H:%M:%S.", time.localtime(second))
+    return f"{_timestamp_prefix}{int((now - second) * 1000):03d}"
+
+
+def format_packet(timestamp: str, payload: bytes):
+    """Decode one packet and return (output text, 3d00 hex log line or None)."""
+    # Dispatch on the raw message type; parsers hex-encode the payload themselves for output
+    msg_type = payload[:2]
+    parser = PACKET_PARSERS.get(msg_type)
+    hex_line = None
+    if parser is None:
+        parsed_output = f"[?] UNKNOWN PACKET TYPE\n    - Full HEX: {payload.hex()}"
+    else:
+        # If it's a 3d00 packet, write the hex to the dedicated log
+        if msg_type == b"\x3d\x00" and HEX_LOG_FILE:
+            hex_line = payload.hex()
+        parsed_output = parser(payload)
+    return f"[{timestamp}] {parsed_output}", hex_line
+
+
+def log_writer():
+    """
+    Drain LOG_QUEUE in batches: decode and format the packets, then print and log
+    them, flushing at most every LOG_FLUSH_INTERVAL_S.
+    """
+    separator = "-" * 60 + "\n"
+    running = True
+    while running:
+        item = LOG_QUEUE.get()
+        batch = []
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL_S
+        while item is not None:
+            batch.append(item)
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = LOG_QUEUE.get(timeout=timeout)
+            except queue.Empty:
+                break
+        else:
+            running = False  # None is the stop signal queued by stop_log_writer()
+        if not batch:
+            continue
+        outputs = []
+        hex_lines = []
+        for timestamp, payload in batch:
+            final_output, hex_line = format_packet(timestamp, payload)
+            outputs.append(final_output)
+            if hex_line:
+                hex_lines.append(f"{hex_line}\n")
+        sys.stdout.write("".join(f"{output}\n{separator}" for output in outputs))
+        sys.stdout.flush()
+        if LOG_FILE:
+            LOG_FILE.write("".join(f"{output}\n" for output in outputs))
+            LOG_FILE.flush()
+        if hex_lines and HEX_LOG_FILE:
+            HEX_LOG_FILE.write("".join(hex_lines))
+            HEX_LOG_FILE.flush()
 
-    payload = packet[UDP].payload.original
-    hex_data = payload.hex()
+        # Catch up on an identity map write deferred during a burst
+        if _identity_dirty:
+            persist_identity_map_debounced()
 
-    timestamp = datetime.datetime.now().strftime("%Y-m-d %H:%M:%S.%f")[:-3]
-    parsed_output = ""
+def start_log_writer():
+    """Start the background thread that decodes and writes packet output."""
+    global LOG_WRITER_THREAD
+    LOG_WRITER_THREAD = threading.Thread(target=log_writer, name="log-writer", daemon=True)
+    LOG_WRITER_THREAD.start()
 
-    if hex_data.startswith(("3d00", "3900", "3100")):
-        # If it's a 3d00 packet, write the hex to the dedicated log
-        if hex_data.startswith("3d00") and HEX_LOG_FILE:
-            HEX_LOG_FILE.write(hex_data + "\n")
-            HEX_LOG_FILE.flush()
-        parsed_output = parse_telemetry_packet(hex_data)
-    elif hex_data.startswith(("3f00", "3f01")):
-        parsed_output = parse_identity_packet(hex_data)
-    elif hex_data.startswith("8006"):
-        parsed_output = parse_ack_packet(hex_data)
-    else:
-        parsed_output = f"[?] UNKNOWN PACKET TYPE\n    - Full HEX: {hex_data}"
 
-    final_output = f"[{timestamp}] {parsed_output}"
-    print(final_output)
-    print("-" * 60)
+def stop_log_writer():
+    """Write out everything still queued and stop the writer thread."""
+    global LOG_WRITER_THREAD
+    if LOG_WRITER_THREAD is not None:
+        LOG_QUEUE.put(None)
+        LOG_WRITER_THREAD.join()
+        LOG_WRITER_THREAD = None
 
-    # Write to the main, detailed log file
-    if LOG_FILE:
-        LOG_FILE.write(final_output + "\n")
-        LOG_FILE.flush()
+
+def packet_handler(packet):
+    """Main handler function for processing each captured packet."""
+    # One layer lookup instead of three ("in" plus two packet[UDP] indexes)
+    udp = packet.getlayer(UDP)
+    if udp is None or udp.dport != SNIFF_PORT:
+        return
+
+    # Decoding and formatting happen on the writer thread, in arrival order
+    LOG_QUEUE.put((format_timestamp(), udp.payload.original))
 
 
 def main():
@@ -332,8 +458,11 @@ def main():
         except Exception:
             pass
 
+        # Always write the final identity map on exit
+        atexit.register(persist_identity_map_debounced, force=True)
+
         # Use a single 'with' block to manage both files
-        with open(log_filename, "w") as f, open(hex_log_filename, "w") as hf:
+        with open(log_filename, "w", buffering=1 << 16) as f, open(hex_log_filename, "w", buffering=1 << 16) as hf:
             LOG_FILE = f
             HEX_LOG_FILE = hf
             print(f"[*] Starting UDP packet sniffer on port {SNIFF_PORT}")
@@ -342,7 +471,11 @@ def main():
             print("=" * 60)
 
             bpf_filter = f"udp and port {SNIFF_PORT}"
-            sniff(filter=bpf_filter, prn=packet_handler, store=0)
+            start_log_writer()
+            try:
+                sniff(filter=bpf_filter, prn=packet_handler, store=0)
+            finally:
+                stop_log_writer()
 
     except PermissionError:
         print("\n[!] PERMISSION ERROR: Please run this script with administrator/root privileges.")
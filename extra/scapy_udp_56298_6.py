@@ -5,6 +5,10 @@ import struct
 from scapy.all import sniff, UDP
 from aa3_converter import convert_xy_to_lat_lon
 import os
+import queue
+import sys
+import threading
+import time
 try:
     import navicon_bridge  # Out-of-process 32-bit DLL bridge
 except Exception:
@@ -13,36 +17,43 @@ except Exception:
 # The UDP port the game is using
 SNIFF_PORT = 56298
 
+# Speed conversion
+MPS_TO_KNOTS = 1.9438445
+
 # Global file handler for logging
 LOG_FILE = None
 
+# Packets are decoded, printed and logged by a writer thread, keeping the sniffer callback short
+LOG_QUEUE = queue.SimpleQueue()  # (timestamp, payload) tuples; None stops the writer
+LOG_FLUSH_INTERVAL_S = 0.1  # Flush console and log files at most this often
+LOG_WRITER_THREAD = None
+
+# 0x3d00 payload words used below: f32[2..5] position/heading, f32[11..16] velocity/accel
+TELEMETRY_FIELDS = struct.Struct("<8x4f20x6f")
+TELEMETRY_TAIL = struct.Struct("<6I")  # last six u32 words
+
+# Packet headers after the 2-byte message type
+TELEMETRY_HEADER = struct.Struct("<2xHI")  # counter (CN), identifier (ID)
+ACK_HEADER = struct.Struct("<4xH")  # acknowledged CN
 
-def decode_3d00_payload(payload_hex: str) -> dict:
-    """Decode a 0x3d00 telemetry payload into useful fields."""
-    b = bytes.fromhex(payload_hex)
-    words = [b[i:i+4] for i in range(0, len(b), 4) if len(b[i:i+4]) == 4]
-    floats = [struct.unpack("<f", w)[0] for w in words]
-    u32s = [int.from_bytes(w, "little") for w in words]
 
+def decode_3d00_payload(payload: bytes) -> dict:
+    """Decode a 0x3d00 telemetry payload into useful fields."""
     # Corrected field mapping based on latest findings
-    pos_x = floats[2]
-    pos_y = floats[3]
-    altitude_m = floats[4]
+    (pos_x, pos_y, altitude_m, heading_raw,
+     vx, vy, vz, ax, ay, az) = TELEMETRY_FIELDS.unpack_from(payload)
     altitude_ft = altitude_m * 3.28084 # Conversion to feet
-    heading_raw = floats[5] # Adjusted index for heading
     heading = (heading_raw % 360.0 + 360.0) % 360.0
 
     # Velocities and accelerations seem to be further down
-    vx, vy, vz = floats[11], floats[12], floats[13]
-    speed_mps = math.sqrt(vx * vx + vy * vy + vz * vz)
-    speed_kt = speed_mps * 1.9438445
+    speed_mps = math.hypot(vx, vy, vz)
+    speed_kt = speed_mps * MPS_TO_KNOTS
     vario_mps = vz
     vario_fpm = vario_mps * 196.850394
 
-    ax, ay, az = floats[14], floats[15], floats[16]
-    a_mag = math.sqrt(ax * ax + ay * ay + az * az)
+    a_mag = math.hypot(ax, ay, az)
 
-    tail = u32s[-6:]
+    tail = list(TELEMETRY_TAIL.unpack_from(payload, len(payload) // 4 * 4 - TELEMETRY_TAIL.size))
 
     return {
         "pos_x": pos_x,
@@ -62,18 +73,19 @@ def decode_3d00_payload(payload_hex: str) -> dict:
     }
 
 
-def parse_telemetry_packet(hex_data: str) -> str:
+def parse_telemetry_packet(payload: bytes) -> str:
     """Decodes telemetry packets (0x3d00 and friends)."""
+    hex_data = payload.hex()
     try:
         msg_type = hex_data[0:4]
-        cn_bytes = bytes.fromhex(hex_data[4:8])
-        cn_decimal = int.from_bytes(cn_bytes, "little")
-        id_bytes = bytes.fromhex(hex_data[8:16])
-        id_decimal = int.from_bytes(id_bytes, "little")
-        payload_hex = hex_data[16:]
+        if len(payload) >= TELEMETRY_HEADER.size:
+            cn_decimal, id_decimal = TELEMETRY_HEADER.unpack_from(payload)
+        else:  # Truncated header: decode whatever is there
+            cn_decimal = int.from_bytes(payload[2:4], "little")
+            id_decimal = int.from_bytes(payload[4:8], "little")
 
         if msg_type == "3d00":
-            decoded = decode_3d00_payload(payload_hex)
+            decoded = decode_3d00_payload(payload[8:])
             # Prefer conversion via NaviCon.dll bridge (AA3.trn in project root), fallback to calibrated model
             lat = lon = float('nan')
             try:
@@ -113,12 +125,15 @@ def parse_telemetry_packet(hex_data: str) -> str:
         return f"[!] Error parsing Telemetry packet: {e}\n    HEX: {hex_data}"
 
 
-def parse_ack_packet(hex_data: str) -> str:
+def parse_ack_packet(payload: bytes) -> str:
     """Decodes the short acknowledgement packets."""
+    hex_data = payload.hex()
     try:
         msg_type = hex_data[0:8]
-        ack_cn_bytes = bytes.fromhex(hex_data[8:12])
-        ack_cn_decimal = int.from_bytes(ack_cn_bytes, "little")
+        if len(payload) >= ACK_HEADER.size:
+            ack_cn_decimal, = ACK_HEADER.unpack_from(payload)
+        else:  # Truncated header: decode whatever is there
+            ack_cn_decimal = int.from_bytes(payload[4:6], "little")
         payload_hex = hex_data[12:]
 
         output = (
@@ -133,31 +148,97 @@ def parse_ack_packet(hex_data: str) -> str:
         return f"[!] Error parsing ACK packet: {e}\n    HEX: {hex_data}"
 
 
-def packet_handler(packet):
-    """Main handler function for processing each captured packet."""
-    if UDP not in packet or packet[UDP].dport != SNIFF_PORT:
-        return
+# First two payload bytes (message type) -> parser taking the raw payload
+PACKET_PARSERS = {
+    b"\x3d\x00": parse_telemetry_packet,
+    b"\x39\x00": parse_telemetry_packet,
+    b"\x31\x00": parse_telemetry_packet,
+    b"\x80\x06": parse_ack_packet,
+}
+
+
+_timestamp_second = None  # Whole second that _timestamp_prefix was formatted for
+_timestamp_prefix = ""
 
-    payload = packet[UDP].payload.original
-    hex_data = payload.hex()
 
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    parsed_output = ""
+def format_timestamp() -> str:
+    """Current local time as "YYYY-MM-DD HH:MM:SS.mmm", running strftime once per second."""
+    global _timestamp_second, _timestamp_prefix
+    now = time.time()
+    second = int(now)
+    if second != _timestamp_second:
+        _timestamp_second = second
+        _timestamp_prefix = time.strftime("%Y-%m-%d %H:%M:%S.", time.localtime(second))
+    return f"{_timestamp_prefix}{int((now - second) * 1000):03d}"
 
-    if hex_data.startswith(("3d00", "3900", "3100")):
-        parsed_output = parse_telemetry_packet(hex_data)
-    elif hex_data.startswith("8006"):
-        parsed_output = parse_ack_packet(hex_data)
+
+def format_packet(timestamp: str, payload: bytes) -> str:
+    """Decode one packet and return its output text."""
+    # Dispatch on the raw message type; parsers hex-encode the payload themselves for output
+    parser = PACKET_PARSERS.get(payload[:2])
+    if parser is None:
+        parsed_output = f"[?] UNKNOWN PACKET TYPE\n    - Full HEX: {payload.hex()}"
     else:
-        parsed_output = f"[?] UNKNOWN PACKET TYPE\n    - Full HEX: {hex_data}"
+        parsed_output = parser(payload)
+    return f"[{timestamp}] {parsed_output}"
+
 
-    final_output = f"[{timestamp}] {parsed_output}"
-    print(final_output)
-    print("-" * 60)
+def log_writer():
+    """
+    Drain LOG_QUEUE in batches: decode and format the packets, then print and log
+    them, flushing at most every LOG_FLUSH_INTERVAL_S.
+    """
+    separator = "-" * 60 + "\n"
+    running = True
+    while running:
+        item = LOG_QUEUE.get()
+        batch = []
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL_S
+        while item is not None:
+            batch.append(item)
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = LOG_QUEUE.get(timeout=timeout)
+            except queue.Empty:
+                break
+        else:
+            running = False  # None is the stop signal queued by stop_log_writer()
+        if not batch:
+            continue
+        outputs = [format_packet(timestamp, payload) for timestamp, payload in batch]
+        sys.stdout.write("".join(f"{output}\n{separator}" for output in outputs))
+        sys.stdout.flush()
+        if LOG_FILE:
+            LOG_FILE.write("".join(f"{output}\n" for output in outputs))
+            LOG_FILE.flush()
 
-    if LOG_FILE:
-        LOG_FILE.write(final_output + "\n")
-        LOG_FILE.flush()
+def start_log_writer():
+    """Start the background thread that decodes and writes packet output."""
+    global LOG_WRITER_THREAD
+    LOG_WRITER_THREAD = threading.Thread(target=log_writer, name="log-writer", daemon=True)
+    LOG_WRITER_THREAD.start()
+
+
+def stop_log_writer():
+    """Write out everything still queued and stop the writer thread."""
+    global LOG_WRITER_THREAD
+    if LOG_WRITER_THREAD is not None:
+        LOG_QUEUE.put(None)
+        LOG_WRITER_THREAD.join()
+        LOG_WRITER_THREAD = None
+
+
+def packet_handler(packet):
+    """Main handler function for processing each captured packet."""
+    # One layer lookup instead of three ("in" plus two packet[UDP] indexes)
+    udp = packet.getlayer(UDP)
+    if udp is None or udp.dport != SNIFF_PORT:
+        return
+
+    # Decoding and formatting happen on the writer thread, in arrival order
+    LOG_QUEUE.put((format_timestamp(), udp.payload.original))
 
 
 def main():
@@ -166,14 +247,18 @@ def main():
     log_filename = f"udp_sniff_log_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
 
     try:
-        with open(log_filename, "w") as f:
+        with open(log_filename, "w", buffering=1 << 16) as f:
             LOG_FILE = f
             print(f"[*] Starting UDP packet sniffer on port {SNIFF_PORT}")
             print(f"[*] Logging to file: {log_filename}")
             print("=" * 60)
 
             bpf_filter = f"udp and port {SNIFF_PORT}"
-            sniff(filter=bpf_filter, prn=packet_handler, store=0)
+            start_log_writer()
+            try:
+                sniff(filter=bpf_filter, prn=packet_handler, store=0)
+            finally:
+                stop_log_writer()
 
     except PermissionError:
         print("\n[!] PERMISSION ERROR: Please run this script with administrator/root privileges.")
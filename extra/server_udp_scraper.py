@@ -2,10 +2,16 @@
 import socket
 import datetime
 import binascii
+import ctypes
+import errno
 import os
 import sys
 import argparse
+import queue
+import selectors
 import signal
+import struct
+import threading
 import time
 from colorama import Fore, Style, init
 
@@ -15,13 +21,264 @@ init()
 # Global variable to control the main loop
 running = True
 
+# recvmmsg(2) batch receive settings (Linux only)
+RECV_BATCH = 64
+RECV_SIZE = 4096
+MSG_WAITFORONE = 0x10000
+
+# Maximum time the main loop blocks waiting for packets. Kept short so
+# Ctrl+C stays responsive on Windows, where select() is not interrupted.
+SELECT_TIMEOUT = 1.0
+STATUS_INTERVAL = 5
+
+# Linux socket options for CPU steering (values from asm-generic/socket.h)
+SO_INCOMING_CPU = getattr(socket, 'SO_INCOMING_CPU', 49)
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+
+# Received batches waiting for the processing loop; a full queue blocks the
+# receiver threads so excess load backs up into the kernel socket buffer
+PACKET_QUEUE_SIZE = 1024
+
+# Capture stream record header: receive time (ns since epoch), payload length, flags
+CAPTURE_HEADER = struct.Struct('<QII')
+
+# Byte translation table for the ASCII dump: printable bytes kept, others become '.'
+ASCII_TABLE = bytes(b if 32 <= b < 127 else ord('.') for b in range(256))
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [("sin_family", ctypes.c_ushort),
+                ("sin_port", ctypes.c_uint16),
+                ("sin_addr", ctypes.c_uint32),  # network byte order, as in_addr.s_addr
+                ("sin_zero", ctypes.c_uint8 * 8)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_IOVec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr),
+                ("msg_len", ctypes.c_uint)]
+
+# sockaddr_in.sin_addr as a native integer holding network-order bytes
+IN_ADDR = struct.Struct('=I')
+
+def pack_filter_addr(ip):
+    """
+    Pre-parse a dotted IPv4 filter address for comparison with raw sin_addr.
+    
+    Returns:
+        int: Value to compare against sockaddr_in.sin_addr, or None if ip is
+             not a valid IPv4 address
+    """
+    try:
+        return IN_ADDR.unpack(socket.inet_aton(ip))[0]
+    except (OSError, TypeError):
+        return None
+
+class BatchReceiver:
+    """
+    Receive up to RECV_BATCH datagrams per syscall using Linux recvmmsg(2).
+    
+    All messages land in one preallocated buffer; each received datagram is
+    copied out as bytes together with its (ip, port) source address.
+    """
+    def __init__(self, batch=RECV_BATCH, size=RECV_SIZE):
+        self.libc = ctypes.CDLL("libc.so.6", use_errno=True)
+        self.recvmmsg = self.libc.recvmmsg
+        self.recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint,
+                                  ctypes.c_int, ctypes.c_void_p]
+        self.recvmmsg.restype = ctypes.c_int
+        
+        self.enabled = True
+        self.batch = batch
+        self.size = size
+        self.buffer = bytearray(batch * size)
+        self.view = memoryview(self.buffer)
+        base = ctypes.addressof((ctypes.c_char * len(self.buffer)).from_buffer(self.buffer))
+        
+        self.iovecs = (_IOVec * batch)()
+        self.names = (_SockAddrIn * batch)()
+        self.msgs = (_MMsgHdr * batch)()
+        for i in range(batch):
+            self.iovecs[i].iov_base = base + i * size
+            self.iovecs[i].iov_len = size
+            hdr = self.msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self.names[i])
+            hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            hdr.msg_iovlen = 1
+    
+    def recv(self, sock, filter_s_addr=None):
+        """
+        Receive a batch of datagrams from the socket.
+        
+        Args:
+            sock: Readable UDP socket
+            filter_s_addr: If set, drop datagrams whose raw source address
+                           (see pack_filter_addr) differs, before copying them
+        
+        Returns:
+            tuple: ([(data, (ip, port)), ...], number of datagrams dropped by
+                   the filter), or None if nothing is queued
+        """
+        namelen = ctypes.sizeof(_SockAddrIn)
+        for i in range(self.batch):
+            self.msgs[i].msg_hdr.msg_namelen = namelen
+        
+        count = self.recvmmsg(sock.fileno(), self.msgs, self.batch, MSG_WAITFORONE, None)
+        if count < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return None
+            raise OSError(err, os.strerror(err))
+        
+        packets = []
+        view = self.view
+        size = self.size
+        for i in range(count):
+            name = self.names[i]
+            s_addr = name.sin_addr
+            if filter_s_addr is not None and s_addr != filter_s_addr:
+                continue
+            offset = i * size
+            data = bytes(view[offset:offset + self.msgs[i].msg_len])
+            addr = (socket.inet_ntoa(IN_ADDR.pack(s_addr)), socket.ntohs(name.sin_port))
+            packets.append((data, addr))
+        return packets, count - len(packets)
+
+def create_batch_receiver():
+    """Create a BatchReceiver on Linux, or return None to use recvfrom_into"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return BatchReceiver()
+    except (OSError, AttributeError):
+        return None
+
+def receive_packets(sock, receiver, buffer, filter_ip=None, filter_s_addr=None):
+    """
+    Receive one or more packets from the socket.
+    
+    Should be called once the socket is readable. Drains everything already
+    queued with recvmmsg when a batch receiver is available; otherwise (or
+    when nothing is queued) falls back to a single recvfrom_into the
+    caller's reusable buffer, copying out only the bytes received.
+    
+    Args:
+        sock: Readable UDP socket
+        receiver: BatchReceiver, or None
+        buffer: Writable memoryview of at least RECV_SIZE bytes
+        filter_ip: If set, drop packets from other source addresses
+        filter_s_addr: filter_ip pre-parsed with pack_filter_addr, compared
+                       against the raw address on the recvmmsg path
+    
+    Returns:
+        tuple: (list of (data, addr) tuples, number of packets dropped by the
+               filter); the list may be empty if everything was filtered
+    """
+    if receiver is not None and receiver.enabled:
+        try:
+            result = receiver.recv(sock, filter_s_addr)
+            if result is not None:
+                return result
+        except OSError as e:
+            # recvmmsg unusable on this system, fall back to recvfrom_into
+            print(f"{Fore.YELLOW}[*] Batch receive failed ({e}), falling back to recvfrom_into{Style.RESET_ALL}")
+            receiver.enabled = False
+    
+    nbytes, addr = sock.recvfrom_into(buffer)
+    if filter_ip and addr[0] != filter_ip:
+        return [], 1
+    return [(bytes(buffer[:nbytes]), addr)], 0
+
+def steer_socket_to_cpu(sock, cpu, busy_poll_us=0):
+    """
+    Ask the kernel to deliver this socket's datagrams on a given CPU (Linux).
+    
+    Args:
+        sock: Bound UDP socket
+        cpu: CPU index for SO_INCOMING_CPU
+        busy_poll_us: If non-zero, set SO_BUSY_POLL to this many microseconds
+    
+    Returns:
+        bool: True if the options were applied
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_INCOMING_CPU, cpu)
+        if busy_poll_us:
+            sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, busy_poll_us)
+        return True
+    except OSError as e:
+        print(f"{Fore.YELLOW}[*] Could not steer socket to CPU {cpu}: {e}{Style.RESET_ALL}")
+        return False
+
+def receive_loop(sock, packet_queue, debug=False, cpu=None, filter_ip=None, dropped=None):
+    """
+    Receiver thread: read batches from one socket and put them on the queue.
+    
+    Args:
+        sock: Bound UDP socket owned by this thread
+        packet_queue: Queue of (timestamp_ns, [(data, addr), ...]) items consumed by the main loop
+        debug: Print which receive path is in use
+        cpu: Pin this thread to the given CPU (Linux), matching the socket's
+             SO_INCOMING_CPU so packets are handled on one core
+        filter_ip: Drop packets from other source IPs before queueing them
+        dropped: One-item list; dropped[0] counts the packets filter_ip
+                 dropped. Only this thread writes it.
+    """
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError as e:
+            print(f"{Fore.YELLOW}[*] Could not pin {threading.current_thread().name} to CPU {cpu}: {e}{Style.RESET_ALL}")
+    
+    receiver = create_batch_receiver()
+    # Reused for every recvfrom_into fallback receive on this thread
+    buffer = memoryview(bytearray(RECV_SIZE))
+    # Parsed once so the recvmmsg path can filter on the raw integer address
+    filter_s_addr = pack_filter_addr(filter_ip) if filter_ip else None
+    if debug:
+        print(f"{Fore.YELLOW}[*] {threading.current_thread().name}: batch receive (recvmmsg) {'enabled' if receiver else 'disabled'}{Style.RESET_ALL}")
+    
+    # Wake only when packets arrive (epoll/select) or to check for shutdown
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    
+    while running:
+        try:
+            if not selector.select(timeout=SELECT_TIMEOUT):
+                continue
+            packets, filtered = receive_packets(sock, receiver, buffer, filter_ip, filter_s_addr)
+            if filtered and dropped is not None:
+                dropped[0] += filtered
+            if packets:
+                # One integer receive stamp per batch; formatted later, off this thread
+                packet_queue.put((time.time_ns(), packets))
+        except OSError as e:
+            if not running:
+                break
+            print(f"{Fore.RED}[!] Receive error: {e}{Style.RESET_ALL}")
+            time.sleep(1)  # Prevent CPU spinning on repeated errors
+    
+    selector.close()
+
 def signal_handler(sig, frame):
     """Handle Ctrl+C and other signals to gracefully exit"""
     global running
     print(f"\n{Fore.YELLOW}[*] Signal received, shutting down...{Style.RESET_ALL}")
     running = False
 
-def setup_udp_listener(host='0.0.0.0', port=56298, buffer_size=4096):
+def setup_udp_listener(host='0.0.0.0', port=56298, buffer_size=4096, reuse_port=False):
     """
     Set up a UDP socket to listen for incoming packets.
     
@@ -29,6 +286,8 @@ def setup_udp_listener(host='0.0.0.0', port=56298, buffer_size=4096):
         host: Host to bind to (default: 0.0.0.0 - all interfaces)
         port: Port to listen on (default: 56298)
         buffer_size: Maximum buffer size for received packets
+        reuse_port: Set SO_REUSEPORT so several sockets can share the port and
+                    the kernel spreads incoming datagrams across them
         
     Returns:
         socket: Configured UDP socket
@@ -39,9 +298,11 @@ def setup_udp_listener(host='0.0.0.0', port=56298, buffer_size=4096):
         
         # Set socket options to reuse address
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         
-        # Set timeout for socket operations
-        sock.settimeout(0.5)
+        # Blocking socket; the receiver waits for readability with a selector
+        sock.setblocking(True)
         
         # Increase buffer size for better performance
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
@@ -67,26 +328,47 @@ def setup_udp_listener(host='0.0.0.0', port=56298, buffer_size=4096):
         print(f"{Fore.RED}[!] Failed to create socket: {e}{Style.RESET_ALL}")
         sys.exit(1)
 
-def save_packet(packet_data, source, timestamp, output_dir):
+def save_packet(packet_data, source, timestamp_ns, sequence, output_dir):
     """
     Save packet data to a file.
     
     Args:
         packet_data: Raw packet data
         source: Source address of the packet
-        timestamp: Timestamp when packet was received
-        output_dir: Directory to save packet data
+        timestamp_ns: Receive time in nanoseconds since the epoch
+        sequence: Packet number, keeps names unique within one receive batch
+        output_dir: Directory to save packet data (created once by main)
     """
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    filename = f"{output_dir}/packet_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.bin"
+    filename = os.path.join(output_dir, f"packet_{timestamp_ns}_{sequence:06d}.bin")
     
     with open(filename, 'wb') as f:
         f.write(packet_data)
     
     print(f"{Fore.CYAN}[*] Packet saved to {filename}{Style.RESET_ALL}")
 
+def open_capture(path):
+    """
+    Open a capture stream for appending framed packet records.
+    
+    Returns:
+        int: Raw file descriptor opened with O_APPEND
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+    return os.open(path, flags, 0o644)
+
+def write_capture_record(fd, packet_data, timestamp_ns, flags=0):
+    """
+    Append one packet to a capture stream.
+    
+    Each record is a CAPTURE_HEADER followed by the raw packet data, written
+    with a single gather write where os.writev is available.
+    """
+    header = CAPTURE_HEADER.pack(timestamp_ns, len(packet_data), flags)
+    if hasattr(os, 'writev'):
+        os.writev(fd, [header, packet_data])
+    else:
+        os.write(fd, header + packet_data)
+
 def main():
     # Set up signal handler for Ctrl+C
     signal.signal(signal.SIGINT, signal_handler)
@@ -99,6 +381,8 @@ def main():
                         help='Save packets to files')
     parser.add_argument('-o', '--output', default='packets',
                         help='Output directory for saved packets (default: packets)')
+    parser.add_argument('-c', '--capture', default=None,
+                        help='Append packets to this single capture file (framed records) instead of one file each')
     parser.add_argument('-f', '--filter', default='3.140.13.20',
                         help='Filter packets from this IP address (default: 3.140.13.20)')
     parser.add_argument('-sp', '--source-port', type=int, default=None,
@@ -107,14 +391,36 @@ def main():
                         help='Enable debug output')
     parser.add_argument('-n', '--no-filter', action='store_true',
                         help='Disable IP filtering (capture all packets)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of receiver threads, each with its own SO_REUSEPORT socket (default: 1)')
+    parser.add_argument('--cpu', type=int, default=None,
+                        help='Pin receiver threads and their sockets to CPUs starting at this index (Linux only)')
+    parser.add_argument('--busy-poll', type=int, default=0,
+                        help='SO_BUSY_POLL time in microseconds for receiver sockets (Linux only, default: 0 = off)')
     args = parser.parse_args()
     
     # If no-filter is set, clear the filter
     if args.no_filter:
         args.filter = None
     
-    # Set up UDP socket
-    sock = setup_udp_listener(port=args.port)
+    # Create the output directory once rather than checking per packet
+    if args.save:
+        os.makedirs(args.output, exist_ok=True)
+    
+    # Open the capture stream once for the whole session
+    capture_fd = None
+    if args.capture:
+        capture_fd = open_capture(args.capture)
+        print(f"{Fore.YELLOW}[*] Appending packets to capture file: {args.capture}{Style.RESET_ALL}")
+    
+    # SO_REUSEPORT fan-out needs kernel support (Linux/BSD, not Windows)
+    workers = max(1, args.workers)
+    if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        print(f"{Fore.YELLOW}[*] SO_REUSEPORT not supported on this platform, using 1 receiver{Style.RESET_ALL}")
+        workers = 1
+    
+    # Set up one UDP socket per receiver thread
+    socks = [setup_udp_listener(port=args.port, reuse_port=workers > 1) for _ in range(workers)]
     
     print(f"{Fore.YELLOW}[*] Debug mode: {'Enabled' if args.debug else 'Disabled'}{Style.RESET_ALL}")
     if args.filter:
@@ -125,6 +431,32 @@ def main():
     if args.source_port:
         print(f"{Fore.YELLOW}[*] Filtering for source port: {args.source_port}{Style.RESET_ALL}")
     
+    # Optionally steer each socket and its receiver thread to the same CPU
+    cpus = [None] * workers
+    if args.cpu is not None:
+        cpu_count = os.cpu_count() or 1
+        cpus = [(args.cpu + i) % cpu_count for i in range(workers)]
+        for sock, cpu in zip(socks, cpus):
+            if steer_socket_to_cpu(sock, cpu, args.busy_poll):
+                print(f"{Fore.YELLOW}[*] Socket steered to CPU {cpu}{Style.RESET_ALL}")
+    
+    # Receivers drop packets from other IPs early; in debug mode every packet
+    # reaches the main loop so it can report and count filtered ones.
+    # Each receiver counts its own drops in its receiver_drops slot.
+    receiver_filter = None if args.debug else args.filter
+    receiver_drops = [[0] for _ in range(workers)]
+    
+    # Receiver threads feed a shared queue; this thread does the processing
+    packet_queue = queue.Queue(maxsize=PACKET_QUEUE_SIZE)
+    receivers = []
+    for i, (sock, cpu, dropped) in enumerate(zip(socks, cpus, receiver_drops)):
+        thread = threading.Thread(target=receive_loop, args=(sock, packet_queue, args.debug, cpu, receiver_filter, dropped),
+                                  name=f"receiver-{i}", daemon=True)
+        thread.start()
+        receivers.append(thread)
+    if workers > 1:
+        print(f"{Fore.YELLOW}[*] Receiver threads: {workers} (SO_REUSEPORT){Style.RESET_ALL}")
+    
     packet_count = 0
     filtered_count = 0
     last_status_time = time.time()
@@ -133,13 +465,20 @@ def main():
     global running
     while running:
         try:
-            # Receive data from socket with timeout
             try:
-                data, addr = sock.recvfrom(4096)
-                
-                # Get current timestamp
-                timestamp = datetime.datetime.now()
-                
+                timestamp_ns, packets = packet_queue.get(timeout=SELECT_TIMEOUT)
+            except queue.Empty:
+                # No data received within timeout period
+                current_time = time.time()
+                # Print status every 5 seconds if no packets
+                if current_time - last_status_time > STATUS_INTERVAL:
+                    print(f"{Fore.YELLOW}[*] Waiting for packets... (Press Ctrl+C to exit){Style.RESET_ALL}")
+                    last_status_time = current_time
+                continue
+            
+            # Converted to a datetime only when a packet is actually printed
+            timestamp = None
+            for data, addr in packets:
                 # Debug output for all packets
                 if args.debug:
                     print(f"{Fore.CYAN}[DEBUG] Received packet from {addr[0]}:{addr[1]}, size: {len(data)} bytes{Style.RESET_ALL}")
@@ -159,6 +498,8 @@ def main():
                     
                 # Process matching packets
                 packet_count += 1
+                if timestamp is None:
+                    timestamp = datetime.datetime.fromtimestamp(timestamp_ns / 1e9)
                 
                 # Print packet information
                 print(f"\n{Fore.BLUE}[{timestamp}] Packet #{packet_count} from {addr[0]}:{addr[1]}{Style.RESET_ALL}")
@@ -172,29 +513,16 @@ def main():
                 for i in range(0, len(hex_dump), 32):
                     print(f"  {hex_dump[i:i+32]}")
                 
-                # Try to print as ASCII if possible
-                try:
-                    ascii_data = ''.join(chr(b) if 32 <= b < 127 else '.' for b in data)
-                    print(f"{Fore.GREEN}ASCII: {Style.RESET_ALL}")
-                    
-                    # Format ASCII in rows of 16 characters
-                    for i in range(0, len(ascii_data), 16):
-                        print(f"  {ascii_data[i:i+16]}")
-                except:
-                    print(f"{Fore.RED}[!] Could not decode as ASCII{Style.RESET_ALL}")
+                # Print as ASCII, non-printable bytes shown as '.'
+                ascii_data = data.translate(ASCII_TABLE).decode('ascii')
+                ascii_rows = '\n'.join(f"  {ascii_data[i:i+16]}" for i in range(0, len(ascii_data), 16))
+                print(f"{Fore.GREEN}ASCII: {Style.RESET_ALL}\n{ascii_rows}")
                 
                 # Save packet if requested
                 if args.save:
-                    save_packet(data, addr, timestamp, args.output)
-                    
-            except socket.timeout:
-                # No data received within timeout period
-                current_time = time.time()
-                # Print status every 5 seconds if no packets
-                if current_time - last_status_time > 5:
-                    print(f"{Fore.YELLOW}[*] Waiting for packets... (Press Ctrl+C to exit){Style.RESET_ALL}")
-                    last_status_time = current_time
-                continue
+                    save_packet(data, addr, timestamp_ns, packet_count, args.output)
+                if capture_fd is not None:
+                    write_capture_record(capture_fd, data, timestamp_ns)
                 
         except Exception as e:
             print(f"{Fore.RED}[!] Error: {e}{Style.RESET_ALL}")
@@ -204,8 +532,14 @@ def main():
             time.sleep(1)  # Prevent CPU spinning on repeated errors
     
     # Clean up
-    print(f"{Fore.GREEN}[+] Captured {packet_count} packets{Style.RESET_ALL}")
-    sock.close()
+    for thread in receivers:
+        thread.join(timeout=2 * SELECT_TIMEOUT)
+    filtered_count += sum(dropped[0] for dropped in receiver_drops)
+    print(f"{Fore.GREEN}[+] Captured {packet_count} packets, filtered {filtered_count}{Style.RESET_ALL}")
+    for sock in socks:
+        sock.close()
+    if capture_fd is not None:
+        os.close(capture_fd)
     sys.exit(0)
 
 if __name__ == "__main__":
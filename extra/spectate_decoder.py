@@ -1,17 +1,107 @@
 #!/usr/bin/env python3
 import json
+import re
 import argparse
 import sys
 import os
 from colorama import Fore, Style, init
 
+# orjson parses bytes directly and is much faster than the stdlib parser
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
 # Initialize colorama for colored output
 init()
 
+# Color codes resolved once for the report builder
+GREEN = Fore.GREEN
+YELLOW = Fore.YELLOW
+CYAN = Fore.CYAN
+WHITE = Fore.WHITE
+RESET = Style.RESET_ALL
+
+# Report layout: (section title, line templates) in display order. Templates
+# are filled from the glider's fields (missing fields show as N/A).
+REPORT_LAYOUT = (
+    ("PLAYER IDENTIFICATION", (
+        "ID: {ID} - Unique player identifier",
+        "CN: {CN} - Competition Number (displayed on glider)",
+        "RN: {RN} - Registration Number",
+        "Name: {firstname} {lastname} - Pilot name",
+        "Country: {country} - Pilot's country",
+    )),
+    ("AIRCRAFT INFORMATION", (
+        "Aircraft: {plane} - Glider model",
+    )),
+    ("POSITION AND MOVEMENT", (
+        "Latitude: {latitude} - {latitude_decoded}",
+        "Longitude: {longitude} - {longitude_decoded}",
+        "Altitude: {altitude} meters - Height above sea level",
+        "Speed: {speed} km/h - Current airspeed",
+        "Heading: {heading}° - Direction of travel (0-359, 0=North, 90=East)",
+        "Vario: {vario} cm/s - Vertical speed (positive=climbing, negative=sinking)",
+    )),
+    ("GAME STATUS", (
+        "Status: {playerstatus} - Current player status in the game",
+        "Selected: {selected} - Whether this glider is currently selected",
+    )),
+    ("COMPETITION INFORMATION", (
+        "Rank: {rank} - Current position in the competition",
+        "Score: {score} - Current score",
+        "Penalty: {penalty} - Any penalties applied",
+        "Average Speed: {averagespeed} - Average speed during the task",
+        "Distance: {dist} - Distance flown in the task",
+        "Time: {time} - Time taken or elapsed time",
+    )),
+)
+
+# Fields covered by the layout above; anything else is an "other" field
+KNOWN_FIELDS = frozenset(('ID', 'CN', 'RN', 'firstname', 'lastname', 'country', 'plane',
+                          'latitude', 'longitude', 'altitude', 'speed', 'heading', 'vario',
+                          'playerstatus', 'selected', 'rank', 'score', 'penalty',
+                          'averagespeed', 'dist', 'time'))
+FIELD_DEFAULTS = dict.fromkeys(KNOWN_FIELDS, 'N/A')
+
+# Layout with colors applied, ready for str.format_map
+REPORT_TEMPLATES = tuple(
+    (f"\n{CYAN}--- {title} ---{RESET}\n",
+     tuple(f"{WHITE}{line}{RESET}\n" for line in lines))
+    for title, lines in REPORT_LAYOUT
+)
+
+# Degrees.Minutes.Seconds with an optional hemisphere suffix, e.g. "45.49.03N"
+LATLON_PATTERN = re.compile(r'(\d+)\.(\d+)\.(\d+)([NSEW]?)')
+
+def decode_dms(value):
+    """
+    Decode a Spectate latitude/longitude string
+    
+    Args:
+        value: Coordinate string such as "DD.MM.SSSN" or "DDD.MM.SSSE"
+        
+    Returns:
+        str: Human readable description, "N/A" or "Could not parse"
+    """
+    if value == 'N/A':
+        return "N/A"
+    if not isinstance(value, str):
+        return "Could not parse"
+    match = LATLON_PATTERN.match(value)
+    if match is None:
+        return "N/A"
+    degrees, minutes, seconds, direction = match.groups()
+    return f"{degrees}° {minutes}' {seconds}\" {direction} (Degrees.Minutes.Seconds)"
+
 def decode_spectate_json(data):
     """
     Decode and explain each field in the Spectate JSON data
     
+    The report is built in memory and written to stdout in one call.
+    
     Args:
         data: Parsed JSON data
     """
@@ -19,87 +109,40 @@ def decode_spectate_json(data):
         print(f"{Fore.RED}Expected a list of gliders, but got {type(data)}{Style.RESET_ALL}")
         return
     
-    print(f"{Fore.GREEN}Found {len(data)} gliders in the data{Style.RESET_ALL}")
+    out = []
+    add = out.append
+    add(f"{GREEN}Found {len(data)} gliders in the data{RESET}\n")
     
     for i, glider in enumerate(data):
-        print(f"\n{Fore.YELLOW}=== GLIDER #{i+1} DETAILED DECODING ==={Style.RESET_ALL}")
-        
-        # Player Identification
-        print(f"\n{Fore.CYAN}--- PLAYER IDENTIFICATION ---{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}ID: {glider.get('ID', 'N/A')} - Unique player identifier{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}CN: {glider.get('CN', 'N/A')} - Competition Number (displayed on glider){Style.RESET_ALL}")
-        print(f"{Fore.WHITE}RN: {glider.get('RN', 'N/A')} - Registration Number{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Name: {glider.get('firstname', 'N/A')} {glider.get('lastname', 'N/A')} - Pilot name{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Country: {glider.get('country', 'N/A')} - Pilot's country{Style.RESET_ALL}")
-        
-        # Aircraft Information
-        print(f"\n{Fore.CYAN}--- AIRCRAFT INFORMATION ---{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Aircraft: {glider.get('plane', 'N/A')} - Glider model{Style.RESET_ALL}")
-        
-        # Position and Movement
-        print(f"\n{Fore.CYAN}--- POSITION AND MOVEMENT ---{Style.RESET_ALL}")
-        
-        # Parse latitude
-        lat_str = glider.get('latitude', 'N/A')
-        lat_decoded = "N/A"
-        if lat_str != 'N/A':
-            try:
-                # Format is typically "DD.MM.SSSN" or "DD.MM.SSSS"
-                parts = lat_str.split('.')
-                if len(parts) >= 3:
-                    degrees = parts[0]
-                    minutes = parts[1]
-                    seconds = parts[2].rstrip('NS')
-                    direction = 'N' if 'N' in lat_str else 'S' if 'S' in lat_str else ''
-                    lat_decoded = f"{degrees}° {minutes}' {seconds}\" {direction} (Degrees.Minutes.Seconds)"
-            except:
-                lat_decoded = "Could not parse"
+        add(f"\n{YELLOW}=== GLIDER #{i+1} DETAILED DECODING ==={RESET}\n")
         
-        # Parse longitude
-        lon_str = glider.get('longitude', 'N/A')
-        lon_decoded = "N/A"
-        if lon_str != 'N/A':
-            try:
-                # Format is typically "DDD.MM.SSSE" or "DDD.MM.SSSW"
-                parts = lon_str.split('.')
-                if len(parts) >= 3:
-                    degrees = parts[0]
-                    minutes = parts[1]
-                    seconds = parts[2].rstrip('EW')
-                    direction = 'E' if 'E' in lon_str else 'W' if 'W' in lon_str else ''
-                    lon_decoded = f"{degrees}° {minutes}' {seconds}\" {direction} (Degrees.Minutes.Seconds)"
-            except:
-                lon_decoded = "Could not parse"
-        
-        print(f"{Fore.WHITE}Latitude: {glider.get('latitude', 'N/A')} - {lat_decoded}{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Longitude: {glider.get('longitude', 'N/A')} - {lon_decoded}{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Altitude: {glider.get('altitude', 'N/A')} meters - Height above sea level{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Speed: {glider.get('speed', 'N/A')} km/h - Current airspeed{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Heading: {glider.get('heading', 'N/A')}° - Direction of travel (0-359, 0=North, 90=East){Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Vario: {glider.get('vario', 'N/A')} cm/s - Vertical speed (positive=climbing, negative=sinking){Style.RESET_ALL}")
+        # Single pass over the glider: known fields fill the report values,
+        # everything else is collected for the "other fields" section
+        values = dict(FIELD_DEFAULTS)
+        other_fields = []
+        for key, value in glider.items():
+            if key in KNOWN_FIELDS:
+                values[key] = value
+            else:
+                other_fields.append((key, value))
         
-        # Game Status
-        print(f"\n{Fore.CYAN}--- GAME STATUS ---{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Status: {glider.get('playerstatus', 'N/A')} - Current player status in the game{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Selected: {glider.get('selected', 'N/A')} - Whether this glider is currently selected{Style.RESET_ALL}")
+        # Parse latitude and longitude
+        values['latitude_decoded'] = decode_dms(values['latitude'])
+        values['longitude_decoded'] = decode_dms(values['longitude'])
         
-        # Competition Information
-        print(f"\n{Fore.CYAN}--- COMPETITION INFORMATION ---{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Rank: {glider.get('rank', 'N/A')} - Current position in the competition{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Score: {glider.get('score', 'N/A')} - Current score{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Penalty: {glider.get('penalty', 'N/A')} - Any penalties applied{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Average Speed: {glider.get('averagespeed', 'N/A')} - Average speed during the task{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Distance: {glider.get('dist', 'N/A')} - Distance flown in the task{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}Time: {glider.get('time', 'N/A')} - Time taken or elapsed time{Style.RESET_ALL}")
+        for section_header, line_templates in REPORT_TEMPLATES:
+            add(section_header)
+            for template in line_templates:
+                add(template.format_map(values))
         
         # Additional fields
-        print(f"\n{Fore.CYAN}--- OTHER FIELDS ---{Style.RESET_ALL}")
-        for key, value in glider.items():
-            if key not in ['ID', 'CN', 'RN', 'firstname', 'lastname', 'country', 'plane', 
-                          'latitude', 'longitude', 'altitude', 'speed', 'heading', 'vario',
-                          'playerstatus', 'selected', 'rank', 'score', 'penalty', 
-                          'averagespeed', 'dist', 'time']:
-                print(f"{Fore.WHITE}{key}: {value} - Additional field{Style.RESET_ALL}")
+        add(f"\n{CYAN}--- OTHER FIELDS ---{RESET}\n")
+        for key, value in other_fields:
+            add(f"{WHITE}{key}: {value} - Additional field{RESET}\n")
+    
+    # Emit the whole report with a single write
+    sys.stdout.write(''.join(out))
+
 
 def main():
     parser = argparse.ArgumentParser(description='Decode Condor Spectate.json Format')
@@ -114,7 +157,7 @@ def main():
     
     if args.json:
         try:
-            data = json.loads(args.json)
+            data = json_loads(args.json)
         except json.JSONDecodeError as e:
             print(f"{Fore.RED}Error decoding JSON string: {e}{Style.RESET_ALL}")
             sys.exit(1)
@@ -124,8 +167,8 @@ def main():
             sys.exit(1)
             
         try:
-            with open(args.file, 'r') as f:
-                data = json.load(f)
+            with open(args.file, 'rb') as f:
+                data = json_loads(f.read())
         except json.JSONDecodeError as e:
             print(f"{Fore.RED}Error decoding JSON from {args.file}: {e}{Style.RESET_ALL}")
             sys.exit(1)
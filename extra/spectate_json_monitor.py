@@ -2,48 +2,190 @@
 import os
 import sys
 import json
+import hashlib
 import time
 import datetime
 import argparse
 import signal
+import threading
 from colorama import Fore, Style, init
 
+# Optional change-notification backends (fall back to plain polling)
+try:
+    import win32con
+    import win32event
+    import win32file
+except ImportError:
+    win32file = None
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# Optional faster JSON parsers: orjson for whole buffers, else ijson (yajl C
+# backend) for streaming the glider list
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+JSON_ERRORS = (ValueError,) if ijson is None else (ValueError, ijson.JSONError)
+
 # Initialize colorama for colored output
 init()
 
 # Global variable to control the main loop
 running = True
 
+# Log file write buffering
+LOG_BUFFER_SIZE = 1 << 20
+LOG_FLUSH_EVERY = 50
+LOG_FLUSH_INTERVAL = 2.0
+# Line ending for the binary log, matching what text mode would write
+LINESEP = os.linesep.encode('ascii')
+
+# Hash and parse result of the last successfully decoded file content
+last_content_hash = None
+last_parsed_data = None
+
 def signal_handler(sig, frame):
     """Handle Ctrl+C and other signals to gracefully exit"""
     global running
     print(f"\n{Fore.YELLOW}[*] Signal received, shutting down...{Style.RESET_ALL}")
     running = False
 
+class FileChangeWaiter:
+    """
+    Block until the watched file's directory reports a change, or a timeout expires.
+    
+    Uses FindFirstChangeNotification on Windows (pywin32), watchdog elsewhere
+    when installed, and falls back to a plain sleep otherwise. Callers still
+    stat the file after every wake, so spurious wakes are harmless.
+    """
+    def __init__(self, file_path):
+        self.file_path = os.path.abspath(file_path)
+        self.directory = os.path.dirname(self.file_path)
+        self.backend = 'poll'
+        self.handle = None
+        self.observer = None
+        self.event = None
+        
+        if not os.path.isdir(self.directory):
+            return
+        
+        if win32file is not None:
+            try:
+                self.handle = win32file.FindFirstChangeNotification(
+                    self.directory, False,
+                    win32con.FILE_NOTIFY_CHANGE_LAST_WRITE
+                    | win32con.FILE_NOTIFY_CHANGE_SIZE
+                    | win32con.FILE_NOTIFY_CHANGE_FILE_NAME)
+                self.backend = 'win32'
+                return
+            except Exception:
+                self.handle = None
+        
+        if Observer is not None:
+            try:
+                self.event = threading.Event()
+                handler = _SpectateEventHandler(self.file_path, self.event)
+                self.observer = Observer()
+                self.observer.schedule(handler, self.directory, recursive=False)
+                self.observer.daemon = True
+                self.observer.start()
+                self.backend = 'watchdog'
+            except Exception:
+                self.observer = None
+                self.event = None
+    
+    def wait(self, timeout):
+        """Wait for a change notification for at most timeout seconds"""
+        if self.backend == 'win32':
+            rc = win32event.WaitForSingleObject(self.handle, int(timeout * 1000))
+            if rc == win32event.WAIT_OBJECT_0:
+                win32file.FindNextChangeNotification(self.handle)
+        elif self.backend == 'watchdog':
+            self.event.wait(timeout)
+            self.event.clear()
+        else:
+            time.sleep(timeout)
+    
+    def close(self):
+        """Release the notification handle or stop the observer thread"""
+        if self.handle is not None:
+            win32file.FindCloseChangeNotification(self.handle)
+            self.handle = None
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join(timeout=1.0)
+            self.observer = None
+
+if Observer is not None:
+    class _SpectateEventHandler(FileSystemEventHandler):
+        """Set an event whenever the watched file is created, modified or moved into place"""
+        def __init__(self, file_path, event):
+            super().__init__()
+            self.file_path = os.path.normcase(file_path)
+            self.event = event
+        
+        def on_any_event(self, event):
+            paths = (getattr(event, 'src_path', ''), getattr(event, 'dest_path', ''))
+            if any(p and os.path.normcase(os.path.abspath(p)) == self.file_path for p in paths):
+                self.event.set()
+
+def parse_spectate_bytes(raw):
+    """
+    Parse raw Spectate.json bytes.
+    
+    Uses orjson directly on the bytes when installed. Otherwise a top-level
+    list of gliders is streamed with ijson if available, and anything else
+    goes through the standard json module.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    if ijson is not None and raw.lstrip()[:1] == b'[':
+        return list(ijson.items(raw, 'item', use_float=True))
+    return json.loads(raw)
+
 def read_spectate_json(file_path):
     """
     Read and parse the Spectate.json file
     
+    Content identical to the previous read (by hash) is not parsed again;
+    the cached result is returned instead.
+    
     Args:
         file_path: Path to the Spectate.json file
         
     Returns:
         tuple: (parsed_data, raw_content) where parsed_data is the JSON data or None if error,
-               and raw_content is the raw file content as a string
+               and raw_content is the raw file content as bytes
     """
-    raw_content = ""
+    global last_content_hash, last_parsed_data
+    raw_content = b""
     try:
-        with open(file_path, 'r') as f:
+        with open(file_path, 'rb') as f:
             raw_content = f.read()
             
         if not raw_content.strip():
             print(f"{Fore.RED}[!] File is empty: {file_path}{Style.RESET_ALL}")
             return None, raw_content
+        
+        content_hash = hashlib.blake2b(raw_content, digest_size=8).digest()
+        if content_hash == last_content_hash:
+            return last_parsed_data, raw_content
             
         try:
-            data = json.loads(raw_content)
+            data = parse_spectate_bytes(raw_content)
+            last_content_hash = content_hash
+            last_parsed_data = data
             return data, raw_content
-        except json.JSONDecodeError as e:
+        except JSON_ERRORS as e:
             print(f"{Fore.RED}[!] Error decoding JSON from {file_path}: {e}{Style.RESET_ALL}")
             return None, raw_content
             
@@ -60,19 +202,17 @@ def log_spectate_data(data, raw_content, timestamp, log_file):
     
     Args:
         data: JSON data to log (can be None)
-        raw_content: Raw file content as string
+        raw_content: Raw file content as bytes
         timestamp: Timestamp for the log entry
-        log_file: Path to the log file
+        log_file: Open binary log file (flushed by the caller)
     """
-    # Format the log entry
-    log_entry = f"SPECTATE JSON {timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')}\n"
+    # Format the log entry header
+    header = f"SPECTATE JSON {timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')}".encode('ascii')
+    log_file.write(header + LINESEP)
     
     # Add the raw content exactly as it appears in the file
-    log_entry += f"{raw_content}\n\n"
-    
-    # Write to log file
-    with open(log_file, 'a') as f:
-        f.write(log_entry)
+    log_file.write(raw_content)
+    log_file.write(LINESEP + LINESEP)
 
 def main():
     # Set up signal handler for Ctrl+C
@@ -85,7 +225,7 @@ def main():
     parser.add_argument('-o', '--output', default='spectate_log.txt',
                         help='Output log file (default: spectate_log.txt)')
     parser.add_argument('-i', '--interval', type=float, default=1.0,
-                        help='Polling interval in seconds (default: 1.0)')
+                        help='Polling interval in seconds, or maximum wait between change notifications (default: 1.0)')
     parser.add_argument('-d', '--debug', action='store_true',
                         help='Enable debug output')
     parser.add_argument('-c', '--clear', action='store_true',
@@ -108,11 +248,20 @@ def main():
     print(f"{Fore.GREEN}[+] Starting Spectate.json monitor{Style.RESET_ALL}")
     print(f"{Fore.YELLOW}[*] Monitoring file: {args.file}{Style.RESET_ALL}")
     print(f"{Fore.YELLOW}[*] Polling interval: {args.interval} seconds{Style.RESET_ALL}")
+    
+    # Wake on file change notifications, using the interval as a timeout
+    waiter = FileChangeWaiter(args.file)
+    print(f"{Fore.YELLOW}[*] Change detection: {waiter.backend}{Style.RESET_ALL}")
     print(f"{Fore.YELLOW}[*] Debug mode: {'Enabled' if args.debug else 'Disabled'}{Style.RESET_ALL}")
     print(f"{Fore.YELLOW}[*] Press Ctrl+C to stop{Style.RESET_ALL}")
     
-    # Track file modification time to avoid re-reading unchanged files
-    last_mtime = 0
+    # Keep the log file open with a large buffer; flushed periodically below
+    log_file = open(args.output, 'ab', buffering=LOG_BUFFER_SIZE)
+    pending_writes = 0
+    last_flush_time = time.time()
+    
+    # Track file modification time and size to avoid re-reading unchanged files
+    last_key = None
     read_count = 0
     last_status_time = time.time()
     
@@ -122,29 +271,35 @@ def main():
         try:
             current_time = time.time()
             
-            # Check if file exists
-            if os.path.exists(args.file):
-                # Get file modification time
-                mtime = os.path.getmtime(args.file)
+            # One stat call per tick gives both existence and change detection
+            try:
+                st = os.stat(args.file)
+            except FileNotFoundError:
+                st = None
+            
+            if st is not None:
+                # mtime alone can miss same-second rewrites, so include size
+                key = (st.st_mtime_ns, st.st_size)
                 
                 # Only read if file has been modified or it's our first read
-                if mtime != last_mtime or read_count == 0:
+                if key != last_key:
                     # Read and parse the JSON file
                     data, raw_content = read_spectate_json(args.file)
                     
                     # Print the raw content exactly as it appears in the file
                     print(f"{Fore.MAGENTA}Raw content:{Style.RESET_ALL}")
-                    print(raw_content)
+                    print(raw_content.decode('utf-8', errors='replace'))
                     
                     if data:
                         # Get current timestamp
                         timestamp = datetime.datetime.now()
                         
                         # Log the data
-                        log_spectate_data(data, raw_content, timestamp, args.output)
+                        log_spectate_data(data, raw_content, timestamp, log_file)
+                        pending_writes += 1
                         
                         # Update tracking variables
-                        last_mtime = mtime
+                        last_key = key
                         read_count += 1
                     
                     else:
@@ -161,8 +316,15 @@ def main():
                     print(f"{Fore.YELLOW}[*] Waiting for {args.file} to appear... (Press Ctrl+C to exit){Style.RESET_ALL}")
                     last_status_time = current_time
             
-            # Sleep for the specified interval
-            time.sleep(args.interval)
+            # Flush buffered log entries every N writes or every few seconds
+            if pending_writes and (pending_writes >= LOG_FLUSH_EVERY
+                                   or current_time - last_flush_time > LOG_FLUSH_INTERVAL):
+                log_file.flush()
+                pending_writes = 0
+                last_flush_time = current_time
+            
+            # Wait for a change notification or the polling interval
+            waiter.wait(args.interval)
             
         except Exception as e:
             print(f"{Fore.RED}[!] Error: {e}{Style.RESET_ALL}")
@@ -172,6 +334,9 @@ def main():
             time.sleep(1)  # Prevent CPU spinning on repeated errors
     
     # Clean up
+    waiter.close()
+    log_file.flush()
+    log_file.close()
     print(f"{Fore.GREEN}[+] Monitored {read_count} updates to {args.file}{Style.RESET_ALL}")
     sys.exit(0)
 
@@ -0,0 +1,80 @@
+# test_flask_server.py
+import gzip
+import json
+import time
+
+import flask_server
+
+
+def _post_fleet(client, count=20):
+    fleet = [{"cookie": f"c{i}", "id": i, "lat": 45.8 + i * 0.01, "lon": 10.27,
+              "identity": f"PILOT{i} Test Glider"} for i in range(count)]
+    assert client.post("/api/positions", json=fleet).status_code == 204
+    # Records are applied by the writer thread; wait for the snapshot to catch up
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline:
+        resp = client.get("/api/positions")
+        if len(json.loads(resp.data)) >= count:
+            return
+        time.sleep(flask_server.SNAPSHOT_MAX_AGE_SEC)
+    raise AssertionError("positions were not applied")
+
+
+def test_conditional_gzip_get_returns_304():
+    client = flask_server.app.test_client()
+    _post_fleet(client)
+
+    first = client.get("/api/positions", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(first.data))) >= 20
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/positions", headers={"Accept-Encoding": "gzip",
+                                                   "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+
+
+def test_identity_and_gzip_etags_differ():
+    client = flask_server.app.test_client()
+    _post_fleet(client)
+
+    plain = client.get("/api/positions")
+    gz = client.get("/api/positions", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"] != gz.headers["ETag"]
+    # A gzip validator must not revalidate an identity-encoded body
+    resp = client.get("/api/positions", headers={"If-None-Match": gz.headers["ETag"]})
+    assert resp.status_code == 200
+
+
+def test_snapshot_records_carry_updated_at():
+    client = flask_server.app.test_client()
+    _post_fleet(client)
+
+    for rec in json.loads(client.get("/api/positions").data):
+        assert rec["updated_at"] == flask_server._iso_utc(rec["updated_ts"])
+        assert not any(key.startswith("_") for key in rec)
+
+
+def test_expiry_heap_stays_bounded_without_polling():
+    client = flask_server.app.test_client()
+    ids = [f"h{i}" for i in range(5)]
+    for n in range(200):
+        fixes = [{"cookie": glider_id, "lat": 45.0 + n * 1e-4, "lon": 10.0} for glider_id in ids]
+        assert client.post("/api/positions", json=fixes).status_code == 204
+
+    # No GET, so nothing prunes; wait for the writer thread to apply the last fix
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline:
+        with flask_server._POSITIONS_LOCK:
+            trail = flask_server.POSITIONS.get(ids[-1])
+            if trail and trail[-1]["lat"] == 45.0 + 199 * 1e-4:
+                break
+        time.sleep(0.01)
+    else:
+        raise AssertionError("positions were not applied")
+
+    with flask_server._POSITIONS_LOCK:
+        assert len(flask_server._EXPIRY) == len(flask_server.POSITIONS)
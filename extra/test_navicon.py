@@ -1,5 +1,5 @@
 # test_navicon.py
-from math import cos, radians, sqrt
+import numpy as np
 import navicon64 as nc
 
 TRN_PATH = r"AA3.trn"
@@ -12,11 +12,14 @@ y_test = 288_000
 lon_ref = 10.2749
 lat_ref = 45.8175
 
+M_PER_DEG_LAT = 111_132.92
+M_PER_DEG_LON_EQUATOR = 111_412.84
+
 def approx_meters(lat_deg, dlat_deg, dlon_deg):
-    # Rough local conversion to meters at given latitude
-    m_per_deg_lat = 111_132.92
-    m_per_deg_lon = 111_412.84 * cos(radians(lat_deg))
-    return sqrt((dlat_deg * m_per_deg_lat) ** 2 + (dlon_deg * m_per_deg_lon) ** 2)
+    # Rough local conversion to meters at given latitude.
+    # Accepts scalars or NumPy arrays (one distance per reference point).
+    return np.hypot(dlat_deg * M_PER_DEG_LAT,
+                    dlon_deg * M_PER_DEG_LON_EQUATOR * np.cos(np.radians(lat_deg)))
 
 def run(y_down_flag):
     print(f"\n=== Testing with y_down={y_down_flag} ===")
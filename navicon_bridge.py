@@ -2,8 +2,17 @@
 navicon_bridge.py
 
 Out-of-process bridge for calling the 32-bit NaviCon.dll from 64-bit Python.
-Uses a persistent helper process (Condor3XY2LatLon_persistent.exe) that keeps
-the DLL loaded and communicates via stdin/stdout for maximum performance.
+Uses persistent helper processes (Condor3XY2LatLon_persistent.exe) that keep
+the DLL loaded and communicate via stdin/stdout for maximum performance.
+Each .trn file gets a small pool of helpers (NAVICON_HELPERS, default up to 4)
+so concurrent callers convert in parallel instead of queueing on one pipe.
+After the READY line the bridge asks the helper to switch to binary frames
+(a uint32 point count plus that many little-endian (x, y) doubles in, the
+same number of (lon, lat) doubles out); helpers built before binary mode
+reply with an error line and are driven with the text protocol instead.
+On Windows the helper is first asked to serve those frames over a
+message-mode named pipe, which carries each frame as one message; if that
+is unsupported or the connection fails, stdin/stdout are used.
 
 Public API:
 - xy_to_latlon_default(x: float, y: float, timeout: float=0.5) -> tuple[float, float]
@@ -12,16 +21,30 @@ Public API:
 - xy_to_latlon_trn(trn_path: str, x: float, y: float, timeout: float=0.5) -> tuple[float, float]
   Same as above but with an explicit .trn path.
 
+- xy_to_latlon_many(points, trn_path: str | None=None, timeout: float=0.5) -> list[tuple[float, float]]
+  Converts a sequence of (x, y) points in one helper round-trip. Returns
+  [(lat, lon), ...]. Uses AA3.trn when trn_path is None.
+
+- clear_cache() -> None
+  Forget cached conversions (e.g. after the .trn file changes on disk).
+
 - shutdown() -> None
-  Gracefully shut down the persistent process. Called automatically at exit.
+  Gracefully shut down the persistent processes. Called automatically at exit.
 """
 from __future__ import annotations
 
 import os
+import struct
 import subprocess
 import atexit
+import functools
+import queue
 import threading
-from typing import Tuple, Optional
+from itertools import chain
+from multiprocessing.connection import Client
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, TypeVar
+
+T = TypeVar("T")
 
 
 def _project_root() -> str:
@@ -35,10 +58,20 @@ def _default_trn_path() -> str:
     return trn
 
 
-# Global persistent process management
-_process: Optional[subprocess.Popen] = None
-_process_trn: Optional[str] = None
-_process_lock = threading.Lock()
+# Persistent helpers per .trn path; each pool starts helpers on demand
+HELPER_POOL_SIZE = int(os.getenv("NAVICON_HELPERS", "0")) or min(4, os.cpu_count() or 1)
+_pools: Dict[str, _HelperPool] = {}
+_pools_lock = threading.Lock()
+
+# Binary protocol: a request is a "<I" point count followed by that many
+# (x, y) doubles; the response is the same number of (lon, lat) doubles
+COUNT = struct.Struct("<I")
+POINT_SIZE = struct.calcsize("<dd")
+BINARY_ACK = b"\x01"
+PIPE_PREFIX = b"\\\\.\\pipe\\"
+# Seconds to wait for the helper to answer BINARY or PIPE; a helper that
+# does not answer in time is killed and replaced by one in text mode
+HANDSHAKE_TIMEOUT = 2.0
 
 
 def _helper_exe_path() -> str:
@@ -88,99 +121,269 @@ def _start_persistent_process(trn_path: str) -> subprocess.Popen:
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,  # Line buffered
         startupinfo=startupinfo,
         creationflags=creationflags,
     )
     
     # Wait for READY signal
     ready_line = proc.stdout.readline().strip()
-    if ready_line != "READY":
-        stderr_output = proc.stderr.read() if proc.stderr else ""
-        raise RuntimeError(f"Helper failed to start. Output: {ready_line}, Stderr: {stderr_output}")
+    if ready_line != b"READY":
+        stderr_output = proc.stderr.read().decode(errors="replace") if proc.stderr else ""
+        raise RuntimeError(f"Helper failed to start. Output: {ready_line!r}, Stderr: {stderr_output}")
     
     return proc
 
 
-def _get_or_start_process(trn_path: str) -> subprocess.Popen:
-    """Get the persistent process, starting it if necessary."""
-    global _process, _process_trn
+def _negotiate_binary(proc: subprocess.Popen) -> bool:
+    """Ask the helper to switch to binary frames. Returns True if it did.
     
-    with _process_lock:
-        # Check if we need to restart (different TRN or dead process)
-        if _process is not None:
-            if _process_trn != trn_path or _process.poll() is not None:
-                # Process died or wrong TRN, restart
-                shutdown()
-        
-        if _process is None:
-            _process = _start_persistent_process(trn_path)
-            _process_trn = trn_path
-        
-        return _process
+    If the helper does not answer within HANDSHAKE_TIMEOUT it is killed and
+    False is returned; the caller must start a new one for text mode.
+    """
+    def read_reply() -> bytes:
+        reply = proc.stdout.read(1)
+        if reply != BINARY_ACK:
+            # Older helper: it rejected the command with an "ERROR: ..." line
+            proc.stdout.readline()
+        return reply
+    
+    proc.stdin.write(b"BINARY\n")
+    proc.stdin.flush()
+    try:
+        return _read_with_timeout(proc, read_reply, HANDSHAKE_TIMEOUT) == BINARY_ACK
+    except TimeoutError:
+        proc.wait()
+        return False
 
 
-def _query_persistent_process(proc: subprocess.Popen, x: float, y: float, timeout: float) -> Tuple[float, float]:
-    """Query the persistent process for a coordinate conversion."""
-    import select
+def _connect_pipe(proc: subprocess.Popen):
+    """Ask the helper to serve a named pipe and connect to it.
     
-    with _process_lock:
-        # Send query
-        query = f"{x} {y}\n"
+    Returns the Connection, or None if the helper does not support it. If the
+    helper created the pipe but connecting failed, or it did not answer within
+    HANDSHAKE_TIMEOUT, the helper is killed since it is blocked.
+    """
+    proc.stdin.write(b"PIPE\n")
+    proc.stdin.flush()
+    try:
+        line = _read_with_timeout(proc, proc.stdout.readline, HANDSHAKE_TIMEOUT).strip()
+    except TimeoutError:
+        proc.wait()
+        return None
+    if not line.startswith(PIPE_PREFIX):
+        # Older helper or pipe creation failed: it answered with an "ERROR: ..." line
+        return None
+    try:
+        return Client(line.decode(), family="AF_PIPE")
+    except OSError:
+        proc.kill()
+        proc.wait()
+        return None
+
+
+class _Helper:
+    """A running persistent helper process and the protocol it speaks."""
+
+    __slots__ = ("proc", "binary", "conn")
+
+    def __init__(self, trn_path: str):
+        self.proc = _start_persistent_process(trn_path)
+        self.conn = _connect_pipe(self.proc) if os.name == "nt" else None
+        if self.conn is None and self.proc.poll() is not None:
+            # The pipe could not be used; start over on stdin/stdout
+            self.proc = _start_persistent_process(trn_path)
+        self.binary = self.conn is not None or _negotiate_binary(self.proc)
+        if not self.binary and self.proc.poll() is not None:
+            # Binary negotiation timed out and killed the helper; use text mode
+            self.proc = _start_persistent_process(trn_path)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def close(self) -> None:
+        """Ask the helper to exit, killing it if it does not."""
         try:
-            proc.stdin.write(query)
-            proc.stdin.flush()
-        except Exception as e:
-            raise RuntimeError(f"Failed to write to helper process: {e}")
-        
-        # Read response with timeout
-        if os.name == 'nt':
-            # Windows doesn't support select on pipes, use threading
-            import queue
-            result_queue = queue.Queue()
-            
-            def read_line():
-                try:
-                    line = proc.stdout.readline()
-                    result_queue.put(('success', line))
-                except Exception as e:
-                    result_queue.put(('error', str(e)))
-            
-            reader_thread = threading.Thread(target=read_line, daemon=True)
-            reader_thread.start()
-            
+            if self.conn is not None:
+                # Named pipe mode ends when the client end is closed
+                self.conn.close()
+            elif self.binary:
+                # Binary mode ends when the helper sees EOF on stdin
+                self.proc.stdin.close()
+            else:
+                # Send EXIT command
+                self.proc.stdin.write(b"EXIT\n")
+                self.proc.stdin.flush()
+            # Wait for process to exit
+            self.proc.wait(timeout=1.0)
+        except Exception:
+            # Force kill if graceful shutdown fails
+            self.proc.kill()
+
+
+class _HelperPool:
+    """Up to `size` helpers for one .trn file, each used by one caller at a time.
+    
+    The LIFO queue holds one token per slot: an idle helper, or None for a slot
+    with no running helper. Busy helpers are reused before new ones start, and
+    a helper that died (e.g. killed on timeout) is replaced on next checkout.
+    """
+
+    def __init__(self, trn_path: str, size: int):
+        self.trn_path = trn_path
+        self.idle: "queue.LifoQueue[Optional[_Helper]]" = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(None)
+
+    def checkout(self) -> _Helper:
+        helper = self.idle.get()
+        if helper is None or not helper.alive():
             try:
-                result_type, result_data = result_queue.get(timeout=timeout)
-                if result_type == 'error':
-                    raise RuntimeError(f"Failed to read from helper: {result_data}")
-                response = result_data.strip()
-            except:
-                # Timeout or error - kill the process
-                proc.kill()
-                raise TimeoutError(f"Helper process timed out after {timeout}s")
-        else:
-            # Unix: use select
-            ready, _, _ = select.select([proc.stdout], [], [], timeout)
-            if not ready:
-                proc.kill()
-                raise TimeoutError(f"Helper process timed out after {timeout}s")
-            response = proc.stdout.readline().strip()
-        
-        if not response:
-            raise RuntimeError("Helper returned empty response")
+                helper = _Helper(self.trn_path)
+            except BaseException:
+                self.idle.put(None)
+                raise
+        return helper
+
+    def checkin(self, helper: _Helper) -> None:
+        self.idle.put(helper if helper.alive() else None)
+
+    def close(self) -> None:
+        """Shut down all idle helpers."""
+        while True:
+            try:
+                helper = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            if helper is not None:
+                helper.close()
+
+
+def _get_pool(trn_path: str) -> _HelperPool:
+    """Get the helper pool for trn_path, creating it if necessary."""
+    pool = _pools.get(trn_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(trn_path)
+            if pool is None:
+                pool = _pools[trn_path] = _HelperPool(trn_path, HELPER_POOL_SIZE)
+    return pool
+
+
+def _run_persistent(trn_path: str, points: List[Tuple[float, float]], timeout: float) -> List[Tuple[float, float]]:
+    """Check out a helper for trn_path, convert points and hand it back."""
+    pool = _get_pool(trn_path)
+    helper = pool.checkout()
+    try:
+        return _query_persistent_process(helper, points, timeout)
+    finally:
+        pool.checkin(helper)
+
+
+def _read_with_timeout(proc: subprocess.Popen, read: Callable[[], T], timeout: float) -> T:
+    """Call read() on the helper's stdout, killing the helper after timeout seconds."""
+    import select
+    
+    if os.name == 'nt':
+        # Windows doesn't support select on pipes, use threading
+        import queue
+        result_queue = queue.Queue()
         
-        if response.startswith("ERROR"):
-            raise RuntimeError(f"Helper returned error: {response}")
+        def reader():
+            try:
+                result_queue.put(('success', read()))
+            except Exception as e:
+                result_queue.put(('error', str(e)))
         
-        # Parse "lon,lat"
-        parts = [p.strip() for p in response.split(",")]
-        if len(parts) != 2:
-            raise ValueError(f"Unexpected helper output: {response}")
+        reader_thread = threading.Thread(target=reader, daemon=True)
+        reader_thread.start()
         
-        lon = float(parts[0])
-        lat = float(parts[1])
-        return lat, lon
+        try:
+            result_type, result_data = result_queue.get(timeout=timeout)
+        except queue.Empty:
+            # Timeout - kill the process
+            proc.kill()
+            raise TimeoutError(f"Helper process timed out after {timeout}s")
+        if result_type == 'error':
+            raise RuntimeError(f"Failed to read from helper: {result_data}")
+        return result_data
+    
+    # Unix: use select
+    ready, _, _ = select.select([proc.stdout], [], [], timeout)
+    if not ready:
+        proc.kill()
+        raise TimeoutError(f"Helper process timed out after {timeout}s")
+    return read()
+
+
+def _parse_text_response(response: str) -> Tuple[float, float]:
+    """Parse a text-protocol "lon,lat" line. Returns (lat, lon)."""
+    if not response:
+        raise RuntimeError("Helper returned empty response")
+    
+    if response.startswith("ERROR"):
+        raise RuntimeError(f"Helper returned error: {response}")
+    
+    # Parse "lon,lat"
+    parts = [p.strip() for p in response.split(",")]
+    if len(parts) != 2:
+        raise ValueError(f"Unexpected helper output: {response}")
+    
+    lon = float(parts[0])
+    lat = float(parts[1])
+    return lat, lon
+
+
+def _write_query(proc: subprocess.Popen, query: bytes) -> None:
+    """Send a whole query to the helper's stdin in one write."""
+    try:
+        proc.stdin.write(query)
+        proc.stdin.flush()
+    except Exception as e:
+        raise RuntimeError(f"Failed to write to helper process: {e}")
+
+
+def _pipe_round_trip(helper: _Helper, query: bytes, timeout: float) -> bytes:
+    """Send one request message over the helper's named pipe and return the reply."""
+    try:
+        helper.conn.send_bytes(query)
+        ready = helper.conn.poll(timeout)
+        if ready:
+            return helper.conn.recv_bytes()
+    except (OSError, EOFError) as e:
+        helper.proc.kill()
+        raise RuntimeError(f"Named pipe to helper failed: {e}")
+    # Timeout - kill the process
+    helper.proc.kill()
+    raise TimeoutError(f"Helper process timed out after {timeout}s")
+
+
+def _query_persistent_process(helper: _Helper, points: List[Tuple[float, float]], timeout: float) -> List[Tuple[float, float]]:
+    """Query a checked-out persistent helper for a batch of coordinate conversions."""
+    n = len(points)
+    if not n:
+        return []
+    
+    proc = helper.proc
+    if helper.binary:
+        size = n * POINT_SIZE
+        query = COUNT.pack(n) + struct.pack(f"<{2 * n}d", *chain.from_iterable(points))
+        if helper.conn is not None:
+            frame = _pipe_round_trip(helper, query, timeout)
+        else:
+            _write_query(proc, query)
+            frame = _read_with_timeout(proc, lambda: proc.stdout.read(size), timeout)
+        if len(frame) != size:
+            raise RuntimeError(f"Helper returned a short frame ({len(frame)} of {size} bytes)")
+        values = struct.unpack(f"<{2 * n}d", frame)
+        # Pairs come back as (lon, lat)
+        return list(zip(values[1::2], values[0::2]))
+    
+    # Text protocol: send all queries in one write
+    _write_query(proc, "".join(f"{x} {y}\n" for x, y in points).encode())
+    # Read every line in one timed call: once the first arrives the rest
+    # may already sit in the pipe's read buffer, invisible to select()
+    lines = _read_with_timeout(proc, lambda: [proc.stdout.readline() for _ in range(n)], timeout)
+    return [_parse_text_response(line.decode().strip()) for line in lines]
 
 
 def _run_helper_oneshot(trn_path: str, x: float, y: float, timeout: float) -> Tuple[float, float]:
@@ -238,19 +441,29 @@ def _run_helper_oneshot(trn_path: str, x: float, y: float, timeout: float) -> Tu
     return lat, lon
 
 
-def _run_helper(trn_path: str, x: float, y: float, timeout: float) -> Tuple[float, float]:
+def _run_helper_impl(trn_path: str, x: float, y: float, timeout: float) -> Tuple[float, float]:
     """Run helper - uses persistent process if available, otherwise one-shot."""
     exe = _helper_exe_path()
     
     if _is_persistent_exe(exe):
-        # Use persistent process
-        proc = _get_or_start_process(trn_path)
-        return _query_persistent_process(proc, x, y, timeout)
+        # Use a pooled persistent process
+        return _run_persistent(trn_path, [(x, y)], timeout)[0]
     else:
         # Fall back to one-shot
         return _run_helper_oneshot(trn_path, x, y, timeout)
 
 
+# Stationary gliders and waypoints convert the same (x, y) again and again;
+# remember recent results so repeats skip the helper round-trip entirely
+XY_CACHE_SIZE = 16384
+_run_helper = functools.lru_cache(maxsize=XY_CACHE_SIZE)(_run_helper_impl)
+
+
+def clear_cache() -> None:
+    """Forget cached conversions (e.g. after the .trn file changes on disk)."""
+    _run_helper.cache_clear()
+
+
 def xy_to_latlon_trn(trn_path: str, x: float, y: float, timeout: float = 0.5, force_oneshot: bool = False) -> Tuple[float, float]:
     """Call helper with an explicit .trn path. Returns (lat, lon).
     
@@ -271,24 +484,32 @@ def xy_to_latlon_default(x: float, y: float, timeout: float = 0.5) -> Tuple[floa
     return _run_helper(_default_trn_path(), x, y, timeout)
 
 
-def shutdown() -> None:
-    """Gracefully shut down the persistent process."""
-    global _process, _process_trn
+def xy_to_latlon_many(points: Iterable[Tuple[float, float]], trn_path: Optional[str] = None,
+                      timeout: float = 0.5) -> List[Tuple[float, float]]:
+    """Convert many (x, y) points with one helper round-trip. Returns [(lat, lon), ...].
     
-    with _process_lock:
-        if _process is not None:
-            try:
-                # Send EXIT command
-                _process.stdin.write("EXIT\n")
-                _process.stdin.flush()
-                # Wait for process to exit
-                _process.wait(timeout=1.0)
-            except Exception:
-                # Force kill if graceful shutdown fails
-                _process.kill()
-            finally:
-                _process = None
-                _process_trn = None
+    Args:
+        points: Iterable of (x, y) coordinates
+        trn_path: Path to the .trn file (defaults to the local AA3.trn)
+        timeout: Timeout in seconds for the whole batch
+    """
+    if trn_path is None:
+        trn_path = _default_trn_path()
+    points = [(float(x), float(y)) for x, y in points]
+    
+    if _is_persistent_exe(_helper_exe_path()):
+        return _run_persistent(trn_path, points, timeout)
+    # One-shot helper converts a single point per process
+    return [_run_helper_oneshot(trn_path, x, y, timeout) for x, y in points]
+
+
+def shutdown() -> None:
+    """Gracefully shut down the persistent processes."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
 
 
 # Register shutdown handler
@@ -15,11 +15,14 @@ CONFIGURATION:
 CONFIG = {
     # Input/Output
     "logfile": "logs/6476_hex_log_3f00_3f01_20251009_041016.txt",  # Path to hex log file
+    "logfiles": [],  # Several log files to replay in parallel, one summary each (overrides logfile)
+    "jobs": 0,  # Worker processes for logfiles (0 = one per CPU)
     "output_dir": "analysis",  # Directory for JSON output
     
     # Replay Behavior
-    "rate_ms": 0,  # Delay between packets in ms (0 = no delay)
+    "rate_ms": 0,  # Time between packets in ms, including processing (0 = no delay)
     "max_packets": None,  # Max packets to process (None = all)
+    "count_only": False,  # Only count lines and 3f00/3f01 packets; nothing is decoded
     
     # Console Output
     "console_output": True,  # Print detailed output to console
@@ -30,7 +33,10 @@ CONFIG = {
     
     # JSON Output
     "json_indent": 2,  # JSON indentation (None = compact)
-    "live_json_update": True,  # Update JSON after each packet
+    "live_json_update": True,  # Periodically rewrite the summary JSON during replay
+    "live_json_every": 1000,  # Packets between live summary rewrites
+    "live_json_interval_ms": 1000,  # ...or time between them, whichever comes first
+    "jsonl_sidecar": False,  # Opt-in: append each decoded packet to a .jsonl file next to the summary
     
     # Error Handling
     "exit_on_file_not_found": True,  # Exit if log file not found
@@ -43,13 +49,28 @@ CONFIG = {
 }
 
 
+import binascii
 import datetime
 import json
+import mmap
+import multiprocessing
 import os
+import struct
 import sys
 import time
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    njit = None
+
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -60,12 +81,36 @@ def get_config(key: str):
     return CONFIG[key]
 
 
+# CONFIG values read for every packet, bound once by bind_parser_config()
+_DEBUG_COOKIE = None
+_DEBUG_ENABLED = False  # debug_cookie is set and debug_verbose is on
+_DEBUG_INLINE = False  # ...and debug_summary_only is off
+_SKIP_CHAT = True
+
+
+def bind_parser_config():
+    """Copy the per-packet parser settings from CONFIG into module globals."""
+    global _DEBUG_COOKIE, _DEBUG_ENABLED, _DEBUG_INLINE, _SKIP_CHAT
+    _DEBUG_COOKIE = CONFIG["debug_cookie"]
+    _DEBUG_ENABLED = bool(_DEBUG_COOKIE) and bool(CONFIG["debug_verbose"])
+    _DEBUG_INLINE = _DEBUG_ENABLED and not CONFIG["debug_summary_only"]
+    _SKIP_CHAT = CONFIG["skip_chat_entities"]
+
+
+bind_parser_config()
+
+
 def validate_config():
     """Validate configuration values."""
     errors = []
     
     if not isinstance(CONFIG["logfile"], str) or not CONFIG["logfile"]:
         errors.append("logfile must be a non-empty string")
+    logfiles = CONFIG["logfiles"]
+    if not isinstance(logfiles, list) or not all(isinstance(f, str) and f for f in logfiles):
+        errors.append("logfiles must be a list of non-empty strings")
+    if not isinstance(CONFIG["jobs"], int) or CONFIG["jobs"] < 0:
+        errors.append("jobs must be a non-negative integer")
     if not isinstance(CONFIG["output_dir"], str):
         errors.append("output_dir must be a string")
     if not isinstance(CONFIG["rate_ms"], int) or CONFIG["rate_ms"] < 0:
@@ -75,6 +120,8 @@ def validate_config():
     if max_packets is not None and (not isinstance(max_packets, int) or max_packets <= 0):
         errors.append("max_packets must be a positive integer or None")
     
+    if not isinstance(CONFIG["count_only"], bool):
+        errors.append("count_only must be a boolean")
     if not isinstance(CONFIG["console_output"], bool):
         errors.append("console_output must be a boolean")
     
@@ -91,6 +138,12 @@ def validate_config():
     
     if not isinstance(CONFIG["live_json_update"], bool):
         errors.append("live_json_update must be a boolean")
+    if not isinstance(CONFIG["live_json_every"], int) or CONFIG["live_json_every"] <= 0:
+        errors.append("live_json_every must be a positive integer")
+    if not isinstance(CONFIG["live_json_interval_ms"], int) or CONFIG["live_json_interval_ms"] <= 0:
+        errors.append("live_json_interval_ms must be a positive integer")
+    if not isinstance(CONFIG["jsonl_sidecar"], bool):
+        errors.append("jsonl_sidecar must be a boolean")
     if not isinstance(CONFIG["exit_on_file_not_found"], bool):
         errors.append("exit_on_file_not_found must be a boolean")
     if not isinstance(CONFIG["show_traceback_on_error"], bool):
@@ -100,20 +153,69 @@ def validate_config():
         raise ValueError("Configuration validation failed:\n  - " + "\n  - ".join(errors))
 
 
+def dumps_json(obj, indent=None) -> bytes:
+    """
+    Serialize an object to UTF-8 JSON bytes, with orjson when it is installed.
+    
+    Args:
+        obj: Object to serialize (non-string dict keys are allowed)
+        indent: JSON indentation (None = compact)
+    
+    Returns:
+        Encoded JSON document
+    """
+    # orjson only indents by 2; other widths use the stdlib encoder
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    separators = (",", ":") if indent is None else None
+    return json.dumps(obj, indent=indent, separators=separators, ensure_ascii=False).encode("utf-8")
+
+
+def write_summary_json(summary: dict, output_path: str, start_time: float):
+    """
+    Stamp the end time on the summary and atomically rewrite the summary JSON file.
+    
+    Args:
+        summary: Summary statistics dictionary
+        output_path: Path of the summary JSON file
+        start_time: time.time() value at the start of the replay
+    """
+    # One clock read per write, shared by both fields so they always agree
+    now = time.time()
+    summary["end_time"] = datetime.datetime.fromtimestamp(now).isoformat()
+    summary["elapsed_seconds"] = now - start_time
+    
+    # Readers of a live summary never see a half-written file
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as jf:
+        jf.write(dumps_json(summary, get_config("json_indent")))
+    os.replace(tmp_path, output_path)
+
+
 def print_config_summary():
     """Print current configuration."""
     print("=" * 80)
     print("CONFIGURATION")
     print("=" * 80)
-    print(f"Input file:              {CONFIG['logfile']}")
+    if CONFIG["logfiles"]:
+        print(f"Input files:             {len(CONFIG['logfiles'])} ({CONFIG['jobs'] or 'one per CPU'} jobs)")
+    else:
+        print(f"Input file:              {CONFIG['logfile']}")
     print(f"Output directory:        {CONFIG['output_dir']}")
     print(f"Rate (ms):               {CONFIG['rate_ms']}")
     print(f"Max packets:             {CONFIG['max_packets'] or 'All'}")
+    print(f"Count only:              {CONFIG['count_only']}")
     print(f"Console output:          {CONFIG['console_output']}")
     print(f"Hex truncate length:     {CONFIG['hex_truncate_length'] or 'Full'}")
     print(f"Skip chat entities:      {CONFIG['skip_chat_entities']}")
     print(f"JSON indent:             {CONFIG['json_indent']}")
-    print(f"Live JSON update:        {CONFIG['live_json_update']}")
+    fast_json = orjson is not None and CONFIG["json_indent"] in (None, 2)
+    print(f"JSON encoder:            {'orjson' if fast_json else 'json (stdlib)'}")
+    print(f"Live JSON update:        {CONFIG['live_json_update']} (every {CONFIG['live_json_every']} packets or {CONFIG['live_json_interval_ms']}ms)")
+    print(f"JSONL sidecar:           {CONFIG['jsonl_sidecar']}")
     print("=" * 80)
     print()
 
@@ -123,6 +225,153 @@ def print_config_summary():
 # PACKET PARSING FUNCTIONS
 # ============================================================================
 
+def _scan_strings(b, min_len, max_len):
+    """
+    Find the length-prefixed printable ASCII strings in an identity packet.
+    Compiled with numba when available; see _scan_strings_py otherwise.
+    
+    Starting after the 12-byte header, zero bytes are skipped; from any other
+    byte the scan looks forward for the next length byte in [min_len, max_len]
+    followed by that many printable ASCII bytes. Scanning stops at the end of
+    the packet or when the next such string is all spaces.
+    
+    Args:
+        b: Packet bytes as a uint8 array
+        min_len: Minimum string length
+        max_len: Maximum string length
+    
+    Returns:
+        List of (scan_offset, string_start, string_length) tuples
+    """
+    spans = []
+    n = len(b)
+    offset = 12
+    while offset < n:
+        if b[offset] == 0:
+            offset += 1
+            continue
+        
+        found = False
+        i = offset
+        length = 0
+        while i + 1 < n:
+            length = int(b[i])
+            if min_len <= length <= max_len and i + 1 + length <= n:
+                printable = True
+                blank = True
+                for j in range(i + 1, i + 1 + length):
+                    c = b[j]
+                    if c < 32 or c >= 127:
+                        printable = False
+                        break
+                    if c != 32:
+                        blank = False
+                if printable:
+                    found = not blank
+                    break
+            i += 1
+        if not found:
+            break
+        spans.append((offset, i + 1, length))
+        offset = i + 1 + length
+    return spans
+
+
+# Maps printable bytes (32..126) to 1 and everything else to 0
+_PRINTABLE_MARKS = bytes(1 if 32 <= c < 127 else 0 for c in range(256))
+
+
+def _scan_strings_py(b: bytes, min_len: int, max_len: int) -> list:
+    """Pure-Python _scan_strings: checks each candidate with C-level bytes ops.
+    
+    The packet is translated to printable marks once, so candidates are
+    tested with find/count over index ranges instead of slicing a new
+    bytes object per scan position.
+    """
+    spans = []
+    n = len(b)
+    marks = b.translate(_PRINTABLE_MARKS)
+    offset = 12
+    while offset < n:
+        if b[offset] == 0:
+            offset += 1
+            continue
+        
+        found = False
+        i = offset
+        length = 0
+        while i + 1 < n:
+            length = b[i]
+            end = i + 1 + length
+            if min_len <= length <= max_len and end <= n and marks.find(0, i + 1, end) < 0:
+                found = b.count(32, i + 1, end) != length
+                break
+            i += 1
+        if not found:
+            break
+        spans.append((offset, i + 1, length))
+        offset = i + 1 + length
+    return spans
+
+
+if njit is not None:
+    _scan_strings_jit = njit(cache=True)(_scan_strings)
+else:
+    _scan_strings_jit = None
+
+
+# Characters of the long hex Competition ID; deleting them leaves nothing
+_HEX_OR_SPACE = b"0123456789abcdefABCDEF "
+
+
+# Packet header: message type (first two bytes read as a little-endian u16), seq, entity_id, cookie
+_HEADER = struct.Struct("<HHII")
+# The values are shared constants, so every result's msg_type is one of two str objects
+_IDENTITY_MSG_TYPES = {0x003F: "3f00", 0x013F: "3f01"}
+# entity_id 20002 (chat messages) as little-endian hex, at hex offset 8 of the packet
+_CHAT_ENTITY_HEX = "224e0000"
+
+
+def skip_chat_packet(hex_data: str):
+    """
+    Build the skipped result for a chat packet from its 12-byte header alone.
+    
+    Args:
+        hex_data: Hexadecimal string of a packet whose entity_id hex is _CHAT_ENTITY_HEX
+    
+    Returns:
+        The skipped result dict, or None if the header is not a valid identity header
+    """
+    try:
+        msg_word, seq, entity_id, cookie = _HEADER.unpack(binascii.unhexlify(hex_data[:24]))
+    except binascii.Error:
+        return None
+    msg_type = _IDENTITY_MSG_TYPES.get(msg_word)
+    if msg_type is None:
+        return None
+    return {
+        "skipped": True,
+        "reason": "entity_id=20002 is chat message",
+        "msg_type": msg_type,
+        "seq": seq,
+        "entity_id": entity_id,
+        "cookie": f"{cookie:08x}",
+        "hex": hex_data
+    }
+
+
+def is_competition_id(s: bytes) -> bool:
+    """Check if a string (as bytes) is the long hex Competition ID."""
+    return len(s) >= 32 and not s.translate(None, _HEX_OR_SPACE)
+
+
+def scan_strings(b: bytes) -> list:
+    """Run the string scanner, compiled with numba when it is installed."""
+    if _scan_strings_jit is not None:
+        return _scan_strings_jit(np.frombuffer(b, dtype=np.uint8), 1, 64)
+    return _scan_strings_py(b, 1, 64)
+
+
 def parse_identity_packet_standalone(hex_data: str) -> dict:
     """
     Decode 0x3f00/0x3f01 identity/config packet.
@@ -143,97 +392,74 @@ def parse_identity_packet_standalone(hex_data: str) -> dict:
             - first_name, last_name, cn, registration, country, aircraft: Player data
     """
     try:
-        b = bytes.fromhex(hex_data)
+        # Chat packets are recognized on the hex header, before decoding the whole packet
+        if _SKIP_CHAT and len(hex_data) >= 40 and hex_data[8:16].lower() == _CHAT_ENTITY_HEX:
+            skipped = skip_chat_packet(hex_data)
+            if skipped is not None:
+                return skipped
+        
+        try:
+            b = binascii.unhexlify(hex_data)
+        except binascii.Error:
+            # bytes.fromhex also accepts whitespace between byte pairs
+            b = bytes.fromhex(hex_data)
         if len(b) < 20:
             return {
                 "error": f"Packet too short (len={len(b)})",
                 "hex": hex_data
             }
 
-        msg_type = b[0:2].hex()
-        if msg_type not in ("3f00", "3f01"):
+        msg_word, seq, entity_id, cookie = _HEADER.unpack_from(b)
+        msg_type = _IDENTITY_MSG_TYPES.get(msg_word)
+        if msg_type is None:
             return {
-                "error": f"Not an identity packet (type=0x{msg_type})",
+                "error": f"Not an identity packet (type=0x{b[0:2].hex()})",
                 "hex": hex_data
             }
-
-        seq = int.from_bytes(b[2:4], "little")
-        entity_id = int.from_bytes(b[4:8], "little")
-        cookie = int.from_bytes(b[8:12], "little")
+        cookie_hex = f"{cookie:08x}"
 
         # Skip entity_id 20002 (chat messages, not players) if configured
-        if entity_id == 20002 and get_config("skip_chat_entities"):
+        if entity_id == 20002 and _SKIP_CHAT:
             return {
                 "skipped": True,
                 "reason": "entity_id=20002 is chat message",
                 "msg_type": msg_type,
                 "seq": seq,
                 "entity_id": entity_id,
-                "cookie": f"{cookie:08x}",
+                "cookie": cookie_hex,
                 "hex": hex_data
             }
 
-        def find_next_string(start_offset, min_len=1, max_len=64):
-            """Scans for the next length-prefixed ASCII string."""
-            i = start_offset
-            while i < len(b):
-                if i + 1 >= len(b):
-                    break
-                length = b[i]
-                if min_len <= length <= max_len and (i + 1 + length) <= len(b):
-                    val_bytes = b[i+1 : i+1+length]
-                    try:
-                        if all(32 <= c < 127 for c in val_bytes):
-                            val = val_bytes.decode('ascii').strip()
-                            return val, i + 1 + length
-                    except UnicodeDecodeError:
-                        pass
-                i += 1
-            return None, len(b)
-
-        def is_competition_id(s: str) -> bool:
-            """Check if a string is the long hex Competition ID."""
-            if not s or len(s) < 32:
-                return False
-            return all(c in '0123456789abcdefABCDEF ' for c in s)
-
         # Check if we should debug this cookie
-        cookie_hex = f"{cookie:08x}"
-        debug_this = get_config("debug_cookie") == cookie_hex and get_config("debug_verbose")
-        debug_summary_only = get_config("debug_summary_only")
+        debug_this = _DEBUG_ENABLED and cookie_hex == _DEBUG_COOKIE
+        debug_inline = debug_this and _DEBUG_INLINE
         
         # Scan the entire packet to find all plausible strings, ignoring the Comp ID
         all_strings = []
-        all_strings_with_offsets = []  # For debugging
-        offset = 12
+        all_strings_with_offsets = []  # For debugging (only filled for debug_this)
         
-        if debug_this and not debug_summary_only:
+        if debug_inline:
             print(f"\n{'='*80}")
             print(f"DEBUG: Parsing cookie {cookie_hex}")
             print(f"Packet length: {len(b)} bytes")
             print(f"Full hex: {hex_data}")
             print(f"{'='*80}")
         
-        while offset < len(b):
-            if b[offset] == 0x00:
-                offset += 1
-                continue
-            
-            val, next_offset = find_next_string(offset)
-            if val:
-                if not is_competition_id(val):
-                    all_strings.append(val)
+        for offset, start, length in scan_strings(b):
+            next_offset = start + length
+            val_bytes = b[start:next_offset].strip()
+            if not is_competition_id(val_bytes):
+                val = val_bytes.decode('ascii')
+                all_strings.append(val)
+                if debug_this:
                     all_strings_with_offsets.append((offset, val, next_offset))
-                    if debug_this and not debug_summary_only:
+                    if debug_inline:
                         print(f"  Found string at offset {offset}: '{val}' (next offset: {next_offset})")
-                offset = next_offset
-            else:
-                break
 
         # Filter out spurious single-character strings
         filtered_strings = [s for s in all_strings if len(s) > 1]
         
-        if debug_this and not debug_summary_only:
+        if debug_inline:
             print(f"\nAll strings found: {all_strings}")
             print(f"After filtering (len>1): {filtered_strings}")
 
@@ -242,21 +468,21 @@ def parse_identity_packet_standalone(hex_data: str) -> dict:
         
         if filtered_strings:
             # The last valid string in the packet is the aircraft name
-            aircraft = filtered_strings.pop()
+            aircraft = filtered_strings[-1]
+            field_strings = filtered_strings[:-1]
             
-            if debug_this and not debug_summary_only:
+            if debug_inline:
                 print(f"\nAssigning aircraft (last string): '{aircraft}'")
-                print(f"Remaining strings for fields: {filtered_strings}")
+                print(f"Remaining strings for fields: {field_strings}")
 
             # Assign the remaining fields in their expected order
-            if len(filtered_strings) > 0:
-                fields_in_order = [None] * 5  # first_name, last_name, country, reg, cn
-                for i in range(min(len(filtered_strings), 5)):
-                    fields_in_order[i] = filtered_strings[i]
-                
+            if len(field_strings) > 0:
+                # first_name, last_name, country, reg, cn; missing trailing fields stay ""
+                fields_in_order = field_strings[:5]
+                fields_in_order += [""] * (5 - len(fields_in_order))
                 first_name, last_name, country, registration, cn = fields_in_order
                 
-                if debug_this and not debug_summary_only:
+                if debug_inline:
                     print(f"\nField assignments:")
                     print(f"  first_name: '{first_name}'")
                     print(f"  last_name: '{last_name}'")
@@ -264,15 +490,8 @@ def parse_identity_packet_standalone(hex_data: str) -> dict:
                     print(f"  registration: '{registration}'")
                     print(f"  cn: '{cn}'")
                     print(f"  aircraft: '{aircraft}'")
-                
-                # Clean up None values to empty strings
-                first_name = first_name or ""
-                last_name = last_name or ""
-                country = country or ""
-                registration = registration or ""
-                cn = cn or ""
-
-        if debug_this and not debug_summary_only:
+
+        if debug_inline:
             print(f"{'='*80}\n")
 
         result = {
@@ -280,7 +499,7 @@ def parse_identity_packet_standalone(hex_data: str) -> dict:
             "msg_type": msg_type,
             "seq": seq,
             "entity_id": entity_id,
-            "cookie": f"{cookie:08x}",
+            "cookie": cookie_hex,
             "cookie_int": cookie,
             "first_name": first_name,
             "last_name": last_name,
@@ -295,8 +514,9 @@ def parse_identity_packet_standalone(hex_data: str) -> dict:
         if debug_this:
             result["_debug"] = {
                 "all_strings": all_strings,
-                "filtered_strings": [s for s in all_strings if len(s) > 1],
-                "strings_with_offsets": all_strings_with_offsets
+                "filtered_strings": filtered_strings,
+                "strings_with_offsets": all_strings_with_offsets,
+                "packet_len": len(b)
             }
         
         return result
@@ -308,10 +528,133 @@ def parse_identity_packet_standalone(hex_data: str) -> dict:
 
 
 
+# ============================================================================
+# LOG READING
+# ============================================================================
+
+# Logs are read as bytes in chunks of this size and split into lines in C
+LOG_READ_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def iter_log_lines(path: str):
+    """
+    Yield every line of a log file as bytes, without its newline.
+    
+    Args:
+        path: Log file path
+    """
+    tail = b""
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            chunk = f.read(LOG_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            yield from lines
+    if tail:
+        yield tail
+
+
+def _count_newlines(mm, start: int, end: int) -> int:
+    """Count the newlines in mm[start:end], copying at most LOG_READ_CHUNK_BYTES at a time."""
+    count = 0
+    while start < end:
+        stop = min(end, start + LOG_READ_CHUNK_BYTES)
+        count += mm[start:stop].count(b"\n")
+        start = stop
+    return count
+
+
+def iter_identity_lines(path: str):
+    """
+    Yield the candidate identity lines of a log file with their line numbers.
+    
+    The file is memory-mapped and searched for lines starting with "3f0", so
+    filler lines are never split out or looked at in Python. This is much
+    faster than iter_log_lines() when identity packets are sparse or only the
+    first few are wanted (max_packets), and slightly slower on logs that hold
+    nothing but identity packets.
+    
+    Args:
+        path: Log file path
+    
+    Yields:
+        (line_number, line) tuples, 1-based, line as bytes without its newline;
+        the last item is (total_lines, b"") so callers always see the line count
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            yield 0, b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            find = mm.find
+            line_num = 1  # line number at pos
+            pos = 0
+            search = 0  # always the start of a line
+            while True:
+                idx = find(b"3f0", search)
+                if idx < 0:
+                    break
+                start = mm.rfind(b"\n", search, idx) + 1 or search
+                eol = find(b"\n", idx)
+                if eol < 0:
+                    eol = size
+                if mm[start:idx].strip():
+                    # "3f0" inside some other line's data
+                    search = eol + 1
+                    continue
+                line_num += _count_newlines(mm, pos, start)
+                yield line_num, mm[start:eol]
+                line_num += 1
+                pos = search = eol + 1
+            
+            # Lines after the last candidate
+            total_lines = line_num - 1
+            if pos < size:
+                total_lines += _count_newlines(mm, pos, size) + (mm[size - 1] != 10)
+            yield total_lines, b""
+
+
+def count_identity_packets(path: str, max_packets: int = None):
+    """
+    Count the lines and 3f00/3f01 packets of a log file without decoding them.
+    
+    Args:
+        path: Log file path
+        max_packets: Stop after this many packets (None = all)
+    
+    Returns:
+        Tuple of (total_lines, packet_types) where packet_types maps
+        "3f00"/"3f01" to the number of packets of that type
+    """
+    total_lines = 0
+    count_3f00 = 0
+    count_3f01 = 0
+    limit = max_packets or -1
+    for raw_line in iter_log_lines(path):
+        total_lines += 1
+        prefix = raw_line.lstrip()[:4]
+        if prefix == b"3f00":
+            count_3f00 += 1
+        elif prefix == b"3f01":
+            count_3f01 += 1
+        else:
+            continue
+        if count_3f00 + count_3f01 == limit:
+            break
+    return total_lines, {"3f00": count_3f00, "3f01": count_3f01}
+
+
 # ============================================================================
 # OUTPUT FORMATTING FUNCTIONS
 # ============================================================================
 
+# Printed after each decoded packet
+PACKET_SEPARATOR = "-" * 80 + "\n"
+
+
 def format_decoded_output(result: dict, line_num: int) -> str:
     """
     Format the decoded packet for console output.
@@ -361,28 +704,34 @@ def format_decoded_output(result: dict, line_num: int) -> str:
 # MAIN REPLAY FUNCTION
 # ============================================================================
 
-def replay_identity_log():
+def replay_identity_log(log_path: str = None, output_name: str = None):
     """
     Replay 3f00/3f01 packets from a log file using configuration settings.
     
-    This function reads the log file specified in CONFIG, decodes identity packets,
+    This function reads the log file (CONFIG logfile by default), decodes identity packets,
     prints decoded information (if console_output is enabled), and generates a
-    live-updating JSON summary file.
+    periodically updated JSON summary file plus an optional per-packet .jsonl sidecar.
     
     All behavior is controlled by the CONFIG dictionary at the top of this file.
     
+    Args:
+        log_path: Log file to replay (None = CONFIG logfile)
+        output_name: Prefix for the output file names (None = the log file's
+                     name without its extension)
+    
     Returns:
-        None
+        Path of the summary JSON file, or None if the log file was not found
     
     Raises:
         SystemExit: If log file not found and exit_on_file_not_found is True
     """
     # Load configuration values
-    log_path = get_config("logfile")
+    log_path = log_path or get_config("logfile")
     output_dir = get_config("output_dir")
     rate_ms = get_config("rate_ms")
     max_packets = get_config("max_packets")
     console_output = get_config("console_output")
+    bind_parser_config()
     
     # Check if log file exists
     if not os.path.exists(log_path):
@@ -396,10 +745,11 @@ def replay_identity_log():
     os.makedirs(output_dir, exist_ok=True)
     
     # Generate output filename based on input filename
-    input_filename = Path(log_path).stem
+    input_filename = output_name or Path(log_path).stem
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     output_filename = f"{input_filename}_analysis_{timestamp}.json"
     output_path = os.path.join(output_dir, output_filename)
+    jsonl_path = os.path.splitext(output_path)[0] + ".jsonl"
     
     # Print configuration summary and replay header
     if console_output:
@@ -409,11 +759,47 @@ def replay_identity_log():
         print("=" * 80)
         print(f"Input file:  {log_path}")
         print(f"Output file: {output_path}")
+        if get_config("jsonl_sidecar") and not get_config("count_only"):
+            print(f"Packet log:  {jsonl_path}")
         print(f"Rate:        {rate_ms}ms delay between packets" if rate_ms > 0 else "Rate:        No delay (maximum speed)")
         print(f"Max packets: {max_packets if max_packets else 'All'}")
         print("=" * 80)
         print()
     
+    if get_config("count_only"):
+        # Throughput mode: integer counters only, no decoding, sidecar, debug or pacing
+        start_time = time.time()
+        summary = {
+            "input_file": log_path,
+            "output_file": output_path,
+            "start_time": datetime.datetime.now().isoformat(),
+            "end_time": None,
+            "count_only": True,
+        }
+        try:
+            total_lines, packet_types = count_identity_packets(log_path, max_packets)
+        except KeyboardInterrupt:
+            total_lines, packet_types = 0, {}
+            if console_output:
+                print("\n\n[!] Interrupted by user (Ctrl+C)")
+        summary["total_lines"] = total_lines
+        summary["packets_processed"] = sum(packet_types.values())
+        summary["packet_types"] = packet_types
+        write_summary_json(summary, output_path, start_time)
+        
+        if console_output:
+            print("=" * 80)
+            print("COUNT COMPLETE - SUMMARY")
+            print("=" * 80)
+            print(f"Total lines read:      {summary['total_lines']}")
+            print(f"Packets counted:       {summary['packets_processed']}")
+            for ptype, count in packet_types.items():
+                print(f"  - 0x{ptype}:           {count}")
+            print(f"Elapsed time:          {summary['elapsed_seconds']:.2f}s")
+            print(f"\nAnalysis saved to:     {output_path}")
+            print("=" * 80)
+        return output_path
+    
     # Summary statistics
     summary = {
         "input_file": log_path,
@@ -432,134 +818,173 @@ def replay_identity_log():
     }
     
     # Debug tracking
-    debug_packets = []  # Collect all debug packets for summary
+    # Collect all debug packets for summary, as parallel lists (seq and msg_type live in the result)
+    debug_line_nums = []
+    debug_results = []
+    # The parser only attaches "_debug" for debug_cookie, and the debug summary is only
+    # written with console output, so nothing is retained otherwise
+    collect_debug = console_output and bool(get_config("debug_cookie"))
+    # Summary tables updated per packet
+    packet_types = summary["packet_types"]
+    unique_cookies = summary["unique_cookies"]
+    unique_entities = summary["unique_entities"]
+    players = summary["players"]
+    write_out = sys.stdout.write
     
     start_time = time.time()
-    line_num = 0
+    line_num = 0  # also the packets_processed count
+    total_lines = 0  # lines read so far, copied into summary whenever it is written
+    live_json_update = get_config("live_json_update")
+    live_json_every = get_config("live_json_every")
+    live_json_interval = get_config("live_json_interval_ms") / 1000.0
+    packet_interval = rate_ms / 1000.0
+    next_packet_time = time.monotonic()
+    last_json_write = time.monotonic()
+    
+    # One compact JSON line per packet; the buffer lets the OS see few large writes
+    jsonl_file = open(jsonl_path, "ab", buffering=64 * 1024) if get_config("jsonl_sidecar") else None
     
     try:
-        with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
-            for raw_line in f:
-                line = raw_line.strip()
-                summary["total_lines"] += 1
-                
-                if not line:
-                    continue
+        # With max_packets, seek straight to candidate lines instead of splitting every line
+        if max_packets:
+            lines = iter_identity_lines(log_path)
+        else:
+            lines = enumerate(iter_log_lines(log_path), 1)
+        for total_lines, raw_line in lines:
+            # Only process 3f00 and 3f01 packets; other lines are never decoded to str
+            line = raw_line.strip()
+            if line[:4] not in (b"3f00", b"3f01"):
+                continue
+            line = line.decode("utf-8", "ignore")
+            
+            line_num += 1
+            summary["packets_processed"] += 1
+            
+            # Decode the packet
+            result = parse_identity_packet_standalone(line)
+            
+            if jsonl_file is not None:
+                jsonl_file.write(dumps_json({"line_num": line_num, **result}))
+                jsonl_file.write(b"\n")
+            
+            # Collect debug info if present
+            if collect_debug and "_debug" in result:
+                debug_line_nums.append(line_num)
+                debug_results.append(result)
+            
+            # Print decoded output if console output is enabled
+            if console_output:
+                write_out(f"{format_decoded_output(result, line_num)}\n{PACKET_SEPARATOR}")
+            
+            # Update summary statistics
+            if result.get("error"):
+                summary["packets_error"] += 1
+            elif result.get("skipped"):
+                summary["packets_skipped"] += 1
+            elif result.get("success"):
+                summary["packets_decoded"] += 1
                 
-                # Only process 3f00 and 3f01 packets
-                if not (line.startswith("3f00") or line.startswith("3f01")):
-                    continue
+                # Track packet types
+                msg_type = result["msg_type"]
+                packet_types[msg_type] = packet_types.get(msg_type, 0) + 1
                 
-                line_num += 1
-                summary["packets_processed"] += 1
+                # Track unique cookies
+                cookie = result["cookie"]
+                seen = unique_cookies.get(cookie)
+                if seen is None:
+                    unique_cookies[cookie] = {
+                        "first_seen_line": line_num,
+                        "last_seen_line": line_num,
+                        "packet_count": 1
+                    }
+                else:
+                    seen["last_seen_line"] = line_num
+                    seen["packet_count"] += 1
                 
-                # Decode the packet
-                result = parse_identity_packet_standalone(line)
+                # Track unique entities
+                entity_id = result["entity_id"]
+                seen = unique_entities.get(entity_id)
+                if seen is None:
+                    unique_entities[entity_id] = {
+                        "first_seen_line": line_num,
+                        "last_seen_line": line_num,
+                        "packet_count": 1,
+                        "cookie": cookie
+                    }
+                else:
+                    seen["last_seen_line"] = line_num
+                    seen["packet_count"] += 1
                 
-                # Collect debug info if present
-                if "_debug" in result:
-                    debug_packets.append({
-                        "line_num": line_num,
-                        "seq": result.get("seq"),
-                        "msg_type": result.get("msg_type"),
-                        "result": result
-                    })
-                
-                # Print decoded output if console output is enabled
+                # Build player profile (merge data from multiple packets)
+                player = players.get(cookie)
+                if player is None:
+                    players[cookie] = {
+                        "cookie": cookie,
+                        "cookie_int": result["cookie_int"],
+                        "entity_id": entity_id,
+                        "first_name": result["first_name"],
+                        "last_name": result["last_name"],
+                        "cn": result["cn"],
+                        "registration": result["registration"],
+                        "country": result["country"],
+                        "aircraft": result["aircraft"],
+                        "first_seen_line": line_num,
+                        "last_seen_line": line_num,
+                        "packet_count": 1,
+                        "packet_types_used": {msg_type: 1}
+                    }
+                else:
+                    # Merge data (prefer non-empty values); empty fields skip the store entirely
+                    value = result["first_name"]
+                    if value:
+                        player["first_name"] = value
+                    value = result["last_name"]
+                    if value:
+                        player["last_name"] = value
+                    value = result["cn"]
+                    if value:
+                        player["cn"] = value
+                    value = result["registration"]
+                    if value:
+                        player["registration"] = value
+                    value = result["country"]
+                    if value:
+                        player["country"] = value
+                    value = result["aircraft"]
+                    if value:
+                        player["aircraft"] = value
+                    player["last_seen_line"] = line_num
+                    player["packet_count"] += 1
+                    # Track packet types used by this player (kept as the JSON-ready dict)
+                    types_used = player["packet_types_used"]
+                    types_used[msg_type] = types_used.get(msg_type, 0) + 1
+            
+            # Rewrite the summary JSON every live_json_every packets or live_json_interval_ms
+            # (live update) if configured; per-packet detail goes to the append-only sidecar instead
+            if live_json_update:
+                now = time.monotonic()
+                if line_num % live_json_every == 0 or now - last_json_write >= live_json_interval:
+                    summary["total_lines"] = total_lines
+                    write_summary_json(summary, output_path, start_time)
+                    last_json_write = now
+            
+            # Check if we've hit max packets
+            if max_packets and line_num >= max_packets:
                 if console_output:
-                    output = format_decoded_output(result, line_num)
-                    print(output)
-                    print("-" * 80)
-                
-                # Update summary statistics
-                if result.get("error"):
-                    summary["packets_error"] += 1
-                elif result.get("skipped"):
-                    summary["packets_skipped"] += 1
-                elif result.get("success"):
-                    summary["packets_decoded"] += 1
-                    
-                    # Track packet types
-                    msg_type = result["msg_type"]
-                    summary["packet_types"][msg_type] = summary["packet_types"].get(msg_type, 0) + 1
-                    
-                    # Track unique cookies
-                    cookie = result["cookie"]
-                    if cookie not in summary["unique_cookies"]:
-                        summary["unique_cookies"][cookie] = {
-                            "first_seen_line": line_num,
-                            "last_seen_line": line_num,
-                            "packet_count": 1
-                        }
-                    else:
-                        summary["unique_cookies"][cookie]["last_seen_line"] = line_num
-                        summary["unique_cookies"][cookie]["packet_count"] += 1
-                    
-                    # Track unique entities
-                    entity_id = result["entity_id"]
-                    if entity_id not in summary["unique_entities"]:
-                        summary["unique_entities"][entity_id] = {
-                            "first_seen_line": line_num,
-                            "last_seen_line": line_num,
-                            "packet_count": 1,
-                            "cookie": cookie
-                        }
-                    else:
-                        summary["unique_entities"][entity_id]["last_seen_line"] = line_num
-                        summary["unique_entities"][entity_id]["packet_count"] += 1
-                    
-                    # Build player profile (merge data from multiple packets)
-                    if cookie not in summary["players"]:
-                        summary["players"][cookie] = {
-                            "cookie": cookie,
-                            "cookie_int": result["cookie_int"],
-                            "entity_id": entity_id,
-                            "first_name": result["first_name"],
-                            "last_name": result["last_name"],
-                            "cn": result["cn"],
-                            "registration": result["registration"],
-                            "country": result["country"],
-                            "aircraft": result["aircraft"],
-                            "first_seen_line": line_num,
-                            "last_seen_line": line_num,
-                            "packet_count": 1,
-                            "packet_types_used": {msg_type: 1}
-                        }
-                    else:
-                        # Merge data (prefer non-empty values)
-                        player = summary["players"][cookie]
-                        player["first_name"] = result["first_name"] or player["first_name"]
-                        player["last_name"] = result["last_name"] or player["last_name"]
-                        player["cn"] = result["cn"] or player["cn"]
-                        player["registration"] = result["registration"] or player["registration"]
-                        player["country"] = result["country"] or player["country"]
-                        player["aircraft"] = result["aircraft"] or player["aircraft"]
-                        player["last_seen_line"] = line_num
-                        player["packet_count"] += 1
-                        # Track packet types used by this player
-                        if msg_type in player["packet_types_used"]:
-                            player["packet_types_used"][msg_type] += 1
-                        else:
-                            player["packet_types_used"][msg_type] = 1
-                
-                # Write summary JSON after each packet (live update) if configured
-                if get_config("live_json_update"):
-                    summary["end_time"] = datetime.datetime.now().isoformat()
-                    summary["elapsed_seconds"] = time.time() - start_time
-                    
-                    with open(output_path, "w", encoding="utf-8") as jf:
-                        json.dump(summary, jf, indent=get_config("json_indent"), ensure_ascii=False)
-                
-                # Check if we've hit max packets
-                if max_packets and summary["packets_processed"] >= max_packets:
-                    if console_output:
-                        print(f"\n[*] Reached max packets limit ({max_packets}). Stopping.")
-                    break
-                
-                # Apply rate limiting
-                if rate_ms > 0:
-                    time.sleep(rate_ms / 1000.0)
-    
+                    print(f"\n[*] Reached max packets limit ({max_packets}). Stopping.")
+                break
+            
+            # Apply rate limiting against a deadline, so processing time counts toward the interval
+            if rate_ms > 0:
+                next_packet_time += packet_interval
+                delay = next_packet_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -packet_interval:
+                    # More than a packet behind (e.g. a stalled console): resume pacing from now
+                    # instead of bursting to catch up
+                    next_packet_time = time.monotonic()
+
     except KeyboardInterrupt:
         if console_output:
             print("\n\n[!] Interrupted by user (Ctrl+C)")
@@ -569,12 +994,12 @@ def replay_identity_log():
             import traceback
             traceback.print_exc()
     finally:
-        # Final summary update (always write at the end)
-        summary["end_time"] = datetime.datetime.now().isoformat()
-        summary["elapsed_seconds"] = time.time() - start_time
+        if jsonl_file is not None:
+            jsonl_file.close()
         
-        with open(output_path, "w", encoding="utf-8") as jf:
-            json.dump(summary, jf, indent=get_config("json_indent"), ensure_ascii=False)
+        # Final summary update (always write at the end)
+        summary["total_lines"] = total_lines
+        write_summary_json(summary, output_path, start_time)
         
         # Print final statistics if console output is enabled
         if console_output:
@@ -612,73 +1037,116 @@ def replay_identity_log():
                 print("-" * 80)
             
             # Print and save debug summary if debug packets were collected
-            if debug_packets and get_config("debug_cookie"):
+            if debug_results and get_config("debug_cookie"):
                 debug_cookie = get_config('debug_cookie')
                 debug_output_path = os.path.join(output_dir, f"debug_{debug_cookie}_{timestamp}.txt")
                 
-                # Build debug output
-                debug_lines = []
-                debug_lines.append("="*80)
-                debug_lines.append(f"DEBUG SUMMARY FOR COOKIE: {debug_cookie}")
-                debug_lines.append("="*80)
-                debug_lines.append(f"Total packets found: {len(debug_packets)}")
-                debug_lines.append("")
+                # Write the debug output straight to the file
+                with open(debug_output_path, "w", encoding="utf-8", buffering=1 << 20) as df:
+                    write = df.write
+                    write("=" * 80 + "\n")
+                    write(f"DEBUG SUMMARY FOR COOKIE: {debug_cookie}\n")
+                    write("=" * 80 + "\n")
+                    write(f"Total packets found: {len(debug_results)}\n")
+                    write("\n")
                 
-                for idx, pkt in enumerate(debug_packets, 1):
-                    result = pkt["result"]
-                    debug_info = result.get("_debug", {})
-                    
-                    # Decode cookie and entity_id from hex
-                    hex_data = result.get('hex', '')
-                    try:
-                        b = bytes.fromhex(hex_data)
-                        entity_id = int.from_bytes(b[4:8], "little") if len(b) >= 8 else "N/A"
-                        cookie_int = int.from_bytes(b[8:12], "little") if len(b) >= 12 else "N/A"
-                        cookie_hex = f"{cookie_int:08x}" if isinstance(cookie_int, int) else "N/A"
-                    except:
-                        entity_id = "N/A"
-                        cookie_hex = "N/A"
+                    for idx, (pkt_line_num, result) in enumerate(zip(debug_line_nums, debug_results), 1):
+                        debug_info = result.get("_debug", {})
                     
-                    debug_lines.append(f"[Packet {idx}] Line {pkt['line_num']} | Type: 0x{pkt['msg_type']} | Seq: {pkt['seq']}")
-                    debug_lines.append(f"  Cookie: {result.get('cookie', 'N/A')} (int: {result.get('cookie_int', 'N/A')})")
-                    debug_lines.append(f"  Entity ID: {result.get('entity_id', 'N/A')}")
-                    debug_lines.append(f"  Packet length: {len(b) if 'b' in locals() else 'N/A'} bytes")
+                        write(f"[Packet {idx}] Line {pkt_line_num} | Type: 0x{result.get('msg_type')} | Seq: {result.get('seq')}\n")
+                        write(f"  Cookie: {result.get('cookie', 'N/A')} (int: {result.get('cookie_int', 'N/A')})\n")
+                        write(f"  Entity ID: {result.get('entity_id', 'N/A')}\n")
+                        write(f"  Packet length: {debug_info.get('packet_len', 'N/A')} bytes\n")
                     
-                    # Show strings with their byte offsets
-                    strings_with_offsets = debug_info.get('strings_with_offsets', [])
-                    if strings_with_offsets:
-                        debug_lines.append(f"  Strings found with offsets:")
-                        for offset, string, next_offset in strings_with_offsets:
-                            length = len(string)
-                            debug_lines.append(f"    Offset {offset:3d}: '{string}' (len={length}, next_offset={next_offset})")
-                    else:
-                        debug_lines.append(f"  All strings found: {debug_info.get('all_strings', [])}")
+                        # Show strings with their byte offsets
+                        strings_with_offsets = debug_info.get('strings_with_offsets', [])
+                        if strings_with_offsets:
+                            write(f"  Strings found with offsets:\n")
+                            for offset, string, next_offset in strings_with_offsets:
+                                length = len(string)
+                                write(f"    Offset {offset:3d}: '{string}' (len={length}, next_offset={next_offset})\n")
+                        else:
+                            write(f"  All strings found: {debug_info.get('all_strings', [])}\n")
                     
-                    debug_lines.append(f"  After filter (len>1): {debug_info.get('filtered_strings', [])}")
-                    debug_lines.append(f"  Final assignment:")
-                    debug_lines.append(f"    first_name:   '{result.get('first_name', '')}'")
-                    debug_lines.append(f"    last_name:    '{result.get('last_name', '')}'")
-                    debug_lines.append(f"    country:      '{result.get('country', '')}'")
-                    debug_lines.append(f"    registration: '{result.get('registration', '')}'")
-                    debug_lines.append(f"    cn:           '{result.get('cn', '')}'")
-                    debug_lines.append(f"    aircraft:     '{result.get('aircraft', '')}'")
-                    debug_lines.append(f"  Hex (first 100 chars): {result.get('hex', '')[:100]}...")
-                    debug_lines.append(f"  Full hex: {result.get('hex', '')}")
-                    debug_lines.append("")
-                
-                debug_lines.append("="*80)
+                        write(f"  After filter (len>1): {debug_info.get('filtered_strings', [])}\n")
+                        write(f"  Final assignment:\n")
+                        write(f"    first_name:   '{result.get('first_name', '')}'\n")
+                        write(f"    last_name:    '{result.get('last_name', '')}'\n")
+                        write(f"    country:      '{result.get('country', '')}'\n")
+                        write(f"    registration: '{result.get('registration', '')}'\n")
+                        write(f"    cn:           '{result.get('cn', '')}'\n")
+                        write(f"    aircraft:     '{result.get('aircraft', '')}'\n")
+                        write(f"  Hex (first 100 chars): {result.get('hex', '')[:100]}...\n")
+                        write(f"  Full hex: {result.get('hex', '')}\n")
+                        write("\n")
                 
-                # Write to file
-                with open(debug_output_path, "w", encoding="utf-8") as df:
-                    df.write("\n".join(debug_lines))
+                    write("=" * 80)
                 
                 # Print to console
                 print(f"\n{'='*80}")
                 print(f"DEBUG SUMMARY FOR COOKIE: {debug_cookie}")
                 print(f"{'='*80}")
-                print(f"Total packets found: {len(debug_packets)}")
+                print(f"Total packets found: {len(debug_results)}")
                 print(f"\nDebug output saved to: {debug_output_path}")
                 print(f"{'='*80}")
+    
+    return output_path
+
+
+def _init_replay_worker(config: dict):
+    """
+    Set up a worker process for replay_identity_logs().
+    
+    Args:
+        config: CONFIG of the parent process (spawned workers re-import this file)
+    """
+    CONFIG.update(config)
+    # Output from several replays would interleave on one console
+    CONFIG["console_output"] = False
+    CONFIG["exit_on_file_not_found"] = False
+    bind_parser_config()
+
+
+def _replay_worker(job: tuple):
+    """Replay one (log_path, output_name) job in a worker process and return (log_path, output_path)."""
+    log_path, output_name = job
+    return log_path, replay_identity_log(log_path, output_name)
+
+
+def replay_identity_logs(log_paths: list):
+    """
+    Replay several log files in parallel, one worker process per file.
+    
+    Each file is replayed independently and gets its own summary JSON (and
+    .jsonl sidecar), exactly as if replay_identity_log() had been run on it.
+    Console output is off in the workers; only a line per finished file is
+    printed. A single file is replayed in this process. Files that share a
+    name (e.g. day1/udp_log.txt and day2/udp_log.txt) get their 1-based
+    position in log_paths appended to the output name, so their outputs
+    never collide.
+    
+    Args:
+        log_paths: Log files to replay
+    """
+    if len(log_paths) == 1:
+        replay_identity_log(log_paths[0])
+        return
+    
+    jobs = min(get_config("jobs") or multiprocessing.cpu_count(), len(log_paths))
+    if get_config("console_output"):
+        print_config_summary()
+    print(f"[*] Replaying {len(log_paths)} log files with {jobs} worker processes")
+    
+    stems = [Path(log_path).stem for log_path in log_paths]
+    shared = {stem for stem in stems if stems.count(stem) > 1}
+    output_names = [f"{stem}_{i}" if stem in shared else stem for i, stem in enumerate(stems, 1)]
+    
+    start_time = time.time()
+    with multiprocessing.Pool(jobs, initializer=_init_replay_worker, initargs=(dict(CONFIG),)) as pool:
+        for log_path, output_path in pool.imap_unordered(_replay_worker, zip(log_paths, output_names)):
+            if output_path is not None:
+                print(f"[*] {log_path} -> {output_path}")
+    print(f"[*] Done in {time.time() - start_time:.2f}s")
 
 
 
@@ -704,7 +1172,10 @@ def main():
         validate_config()
         
         # Run the replay
-        replay_identity_log()
+        if CONFIG["logfiles"]:
+            replay_identity_logs(CONFIG["logfiles"])
+        else:
+            replay_identity_log()
         
     except ValueError as e:
         print(f"\n[!] CONFIGURATION ERROR: {e}")